@@ -0,0 +1,204 @@
+from utils import polynomial_ring
+from ringgsw import RingGSW
+from codec import encode
+from itertools import product
+from time import perf_counter
+from random import randrange, sample
+from os import urandom
+import ot_1_N, ot_K_N
+import instrument
+import tracemalloc
+import argparse
+import json
+import sys
+
+
+def timeit(fn, repeat):
+
+    samples = []
+
+    for _ in range(repeat):
+        start = perf_counter()
+        fn()
+        samples.append(perf_counter() - start)
+
+    return samples
+
+
+def peak_memory(fn):
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak
+
+
+def percentile(samples, p):
+
+    samples = sorted(samples)
+    i = min(int(round(p / 100 * (len(samples) - 1))), len(samples) - 1)
+
+    return samples[i]
+
+
+def summarize(samples):
+
+    mean = sum(samples) / len(samples)
+
+    return {
+        'runs': len(samples),
+        'mean_s': mean,
+        'p50_s': percentile(samples, 50),
+        'p90_s': percentile(samples, 90),
+        'p99_s': percentile(samples, 99),
+        'ops_per_sec': 1 / mean if mean > 0 else None
+    }
+
+
+def measure(fn, repeat):
+
+    try:
+        fn()
+        result = summarize(timeit(fn, repeat))
+        result['peak_bytes'] = peak_memory(fn)
+    except Exception as e:
+        result = {'error': f'{type(e).__name__}: {e}'}
+
+    return result
+
+
+def bench_primitives(ring, sigma, backend, repeat):
+
+    rgsw = RingGSW(ring, sigma, backend)
+    sk, pk = rgsw.keygen()
+
+    m1, m2 = rgsw.randomElement(), rgsw.randomElement()
+    ct1, ct2 = rgsw.encrypt(m1, pk), rgsw.encrypt(m2, pk)
+    g = randrange(1, int(rgsw.q))
+
+    return {
+        'keygen': measure(rgsw.keygen, repeat),
+        'encrypt': measure(lambda: rgsw.encrypt(m1, pk), repeat),
+        'decrypt': measure(lambda: rgsw.decrypt(ct1, sk), repeat),
+        'homMultConst': measure(lambda: rgsw.homMultConst(ct1, g), repeat),
+        'homAdd': measure(lambda: rgsw.homAdd(ct1, ct2), repeat),
+        'matrixFlatten': measure(lambda: rgsw.matrixFlatten(ct1 + ct2), repeat)
+    }
+
+
+def bench_sampling(ring, sigma, backend, repeat, size=1<<16):
+
+    rgsw = RingGSW(ring, sigma, backend)
+    sampler = rgsw.sampler
+    _, pk = rgsw.keygen()
+    m = rgsw.randomElement()
+
+    result = {}
+
+    for name in ['uniform', 'binary', 'gaussian']:
+        entry = measure(lambda: getattr(sampler, name)(size), repeat)
+        if 'mean_s' in entry:
+            entry['coeffs_per_sec'] = size / entry['mean_s']
+        result[name] = entry
+
+    randomness = measure(lambda: sampler.binary((rgsw.N, rgsw.n)), repeat)
+    encrypt = measure(lambda: rgsw.encrypt(m, pk), repeat)
+    if 'mean_s' in randomness and 'mean_s' in encrypt:
+        result['encrypt_randomness_share'] = randomness['mean_s'] / encrypt['mean_s']
+
+    return result
+
+
+def bench_protocols(ring, sigma, backend, t, K, repeat):
+
+    msg_list = [urandom(16) for _ in range(t)]
+
+    return {
+        'ot_1_N': measure(lambda: ot_1_N.obliviousTransfer(ring, msg_list, randrange(t), sigma, backend), repeat),
+        'ot_K_N': measure(lambda: ot_K_N.obliviousTransfer(ring, msg_list, sample(range(t), K), sigma, backend), repeat)
+    }
+
+
+def serialized_sizes(ring, sigma):
+
+    rgsw = RingGSW(ring, sigma, 'numpy')
+    sk, cpk = rgsw.keygenSeeded()
+    pk = rgsw.expandKey(cpk)
+    ct = rgsw.encrypt(rgsw.randomElement(), pk)
+
+    return {
+        'public_key': len(encode(pk)),
+        'seeded_public_key': len(encode(cpk)),
+        'secret_key': len(encode(sk)),
+        'ciphertext': len(encode(ct))
+    }
+
+
+def run(logq, logn, sigmas, ts, Ks, backend='numpy', repeat=5, protocols=True, profile=False):
+
+    results = []
+    sink = instrument.CounterSink()
+
+    for lq, ln, sigma in product(logq, logn, sigmas):
+
+        ring = polynomial_ring(2**lq, 2**ln)
+        record = {'q': 2**lq, 'n': 2**ln, 'sigma': sigma, 'backend': backend}
+
+        record['primitives'] = bench_primitives(ring, sigma, backend, repeat)
+        record['sampling'] = bench_sampling(ring, sigma, backend, repeat)
+        record['sizes'] = serialized_sizes(ring, sigma)
+        record['protocols'] = []
+
+        if protocols:
+            for t, K in product(ts, Ks):
+                if K >= t: continue
+                entry = {'t': t, 'K': K}
+                if profile: instrument.enable(sink)
+                try:
+                    entry.update(bench_protocols(ring, sigma, backend, t, K, repeat))
+                finally:
+                    instrument.disable()
+                if profile: entry['phases'] = sink.snapshot()
+                sink.reset()
+                record['protocols'].append(entry)
+
+        results.append(record)
+        print(f'[*] q=2^{lq} n=2^{ln} sigma={sigma} done', file=sys.stderr)
+
+    return results
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description='RingGSW / OT benchmark suite')
+    parser.add_argument('--logq', type=int, nargs='+', default=[17])
+    parser.add_argument('--logn', type=int, nargs='+', default=[4])
+    parser.add_argument('--sigma', type=float, nargs='+', default=[5])
+    parser.add_argument('--t', type=int, nargs='+', default=[8])
+    parser.add_argument('--K', type=int, nargs='+', default=[2])
+    parser.add_argument('--backend', choices=['sage', 'numpy'], default='numpy')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--no-protocols', action='store_true')
+    parser.add_argument('--profile', action='store_true')
+    parser.add_argument('--out', default='-')
+    args = parser.parse_args(argv)
+
+    results = run(args.logq, args.logn, args.sigma, args.t, args.K,
+                  args.backend, args.repeat, not args.no_protocols, args.profile)
+
+    out = json.dumps({'benchmarks': results}, indent=2)
+
+    if args.out == '-':
+        print(out)
+    else:
+        with open(args.out, 'w') as f:
+            f.write(out)
+
+
+if __name__ == '__main__':
+
+    main()
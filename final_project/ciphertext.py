@@ -0,0 +1,150 @@
+import numpy as np
+
+
+class RingArray:
+
+    __slots__ = ['data', 'q', 'n', 'cache']
+
+
+    def __init__(self, data, q, n):
+
+        data = np.ascontiguousarray(unwrap(data))
+        assert data.shape[-1] == n
+
+        self.data = data
+        self.q = q
+        self.n = n
+        self.cache = {}
+
+
+    @property
+    def shape(self):
+
+        return self.data.shape
+
+
+    @property
+    def ndim(self):
+
+        return self.data.ndim
+
+
+    @property
+    def nbytes(self):
+
+        return self.data.nbytes
+
+
+    def __array__(self, dtype=None, copy=None):
+
+        return self.data if dtype is None else self.data.astype(dtype)
+
+
+    def __len__(self):
+
+        return len(self.data)
+
+
+    def __getitem__(self, idx):
+
+        item = self.data[idx]
+
+        if item.ndim < 2 or item.shape[-1] != self.n:
+            return item
+
+        return type(self)(item, self.q, self.n)
+
+
+    def __iter__(self):
+
+        for i in range(len(self)):
+            yield self[i]
+
+
+    def wide(self):
+
+        return self.data.astype(np.int64) if self.data.dtype.kind == 'u' else self.data
+
+
+    def __iadd__(self, other):
+
+        if self.data.dtype.kind == 'u':
+            self.data = (self.wide() + unwrap(other)) % self.q
+        else:
+            np.add(self.data, unwrap(other), out=self.data)
+            np.remainder(self.data, self.q, out=self.data)
+
+        self.cache.clear()
+
+        return self
+
+
+    def __isub__(self, other):
+
+        if self.data.dtype.kind == 'u':
+            self.data = (self.wide() - unwrap(other)) % self.q
+        else:
+            np.subtract(self.data, unwrap(other), out=self.data)
+            np.remainder(self.data, self.q, out=self.data)
+
+        self.cache.clear()
+
+        return self
+
+
+    def __add__(self, other):
+
+        return type(self)((self.wide() + unwrap(other)) % self.q, self.q, self.n)
+
+
+    def __sub__(self, other):
+
+        return type(self)((self.wide() - unwrap(other)) % self.q, self.q, self.n)
+
+
+    def __eq__(self, other):
+
+        return self.data == unwrap(other)
+
+
+    def cached(self, key, build):
+
+        if key not in self.cache:
+            self.cache[key] = build()
+
+        return self.cache[key]
+
+
+    def copy(self):
+
+        return type(self)(self.data.copy(), self.q, self.n)
+
+
+    def __reduce__(self):
+
+        return (type(self), (self.data, self.q, self.n))
+
+
+    def __repr__(self):
+
+        return f'{type(self).__name__}(shape={self.shape}, q={self.q}, n={self.n})'
+
+
+class Ciphertext(RingArray):
+
+    __slots__ = []
+
+
+class PublicKey(RingArray):
+
+    __slots__ = []
+
+
+class SecretKey(RingArray):
+
+    __slots__ = []
+
+
+def unwrap(obj):
+
+    return obj.data if isinstance(obj, RingArray) else obj
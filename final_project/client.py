@@ -1,106 +1,183 @@
-from utils import send_data, recv_data
-import ot_1_N, ot_K_N
-import socket
-import pickle
-
-
-def on_connect(s):
-
-    ring = pickle.loads(recv_data(s))
-    sender_pk = pickle.loads(recv_data(s))
-    t = pickle.loads(recv_data(s))
-
-    choice = []
-    while len(choice) == 0:
-    
-        choice = input(f'\nenter your choice(s) (0 to {t-1}): ').split(',')
-        choice = [int(c) for c in choice]
-    
-        if len(choice) == 0 or any([c < 0 or c >= t for c in choice]):
-            print('invalid choice')
-            choice = []
-
-    if len(choice) == 1:
-        ot_recv = ot_1_N.OTReceiver(ring, sender_pk, choice[0], t)
-    else:
-        ot_recv = ot_K_N.OTReceiver(ring, sender_pk, choice, t)
-
-    send_data(s, pickle.dumps(ot_recv.scheme))
-
-    return ot_recv, choice
-
-
-def ot_1_out_of_N(s, ot_recv):
-
-    A = pickle.loads(recv_data(s))
-    print('\nrecevied the random encryption (A)\n')
-
-    print('sending homomorphic encryption of A (B)\n')
-    B = ot_recv.homomorphic_encryption(A)
-    send_data(s, pickle.dumps(B))
-
-    ct_list = pickle.loads(recv_data(s))
-    print('recevied symmetric AES ciphertexts:\n')
-    for i in range(len(ct_list)):
-        print(f'{i}. {ct_list[i].hex()}')
-
-    return ot_recv.decrypt(ct_list)
-
-
-def ot_K_out_of_N(s, ot_recv):
-
-    A, T_A = pickle.loads(recv_data(s))
-    print('\nreceived the random encryption (A, T_A)\n')
-
-    print('sending homomorphic encryptions of A (U, T_B)\n')
-    U, T_B = ot_recv.homomorphic_encryption(A, T_A)
-    send_data(s, pickle.dumps((U, T_B)))
-
-    sender_fake_sk = pickle.loads(recv_data(s))
-    print('received dummy secret key\nverification: ', end='')
-
-    if ot_recv.verify_fake_sk(sender_fake_sk):
-        print('[OK]\n')
-    else:
-        print('[Failed]\n')
-        raise AssertionError('invalid dummy secret key')
-
-    ct_list, V = pickle.loads(recv_data(s))
-    print('received symmetric AES ciphertexts:')
-    for i in range(len(ct_list)):
-        print(f'{i}. {ct_list[i].hex()}')
-
-    return ot_recv.decrypt(ct_list, V)
-
-
-def main(host, port):
-
-    s = socket.socket()
-    s.connect((host, port))
-    print('\nconnected to sender\n')
-
-    try:
-
-        print('received parameters (ring, public key)')
-        ot_recv, choice = on_connect(s)
-
-        if ot_recv.scheme == '1_OUT_OF_N':
-            msg = ot_1_out_of_N(s, ot_recv)
-            print(f'\ndecrypted message:\n{choice[0]}. {msg.hex()}\n')
-        
-        elif ot_recv.scheme == 'K_OUT_OF_N':
-            msg = ot_K_out_of_N(s, ot_recv)
-            print(f'\ndecrypted message(s):\n')
-            for i in range(len(msg)):
-                print(f'{choice[i]}. {msg[i].hex()}')
-
-    except Exception as e:
-        print(str(e))
-
-    s.close()
-    print('\n[*] connection closed\n')
-
-
-if __name__ == '__main__':
-
-    main('localhost', 3000)
+from utils import send_data, recv_data, polynomial_ring, MeteredSocket
+from stream import recv_stream, skip_stream
+from pipeline import pipelined_receiver
+from codec import decode, encode
+import ot_1_N, ot_K_N
+import tracemalloc
+import socket
+import os
+import sys
+
+
+BACKEND = 'numpy'
+
+
+def on_connect(s, stream=False, pipeline=False):
+
+    params = decode(recv_data(s))
+    ring = polynomial_ring(params.q, params.n)
+    sender_pk = decode(recv_data(s))
+    t = decode(recv_data(s))
+
+    choice = []
+    while len(choice) == 0:
+    
+        choice = input(f'\nenter your choice(s) (0 to {t-1}): ').split(',')
+        choice = [int(c) for c in choice]
+    
+        if len(choice) == 0 or any([c < 0 or c >= t for c in choice]):
+            print('invalid choice')
+            choice = []
+
+    if pipeline:
+        ot_recv = [ot_1_N.OTReceiver(ring, sender_pk, c, t, BACKEND, base_log=params.base_log) for c in choice]
+        send_data(s, encode(['1_OUT_OF_N', 'PIPELINE', len(choice)]))
+        return ot_recv, choice
+
+    if len(choice) == 1:
+        ot_recv = ot_1_N.OTReceiver(ring, sender_pk, choice[0], t, BACKEND, base_log=params.base_log)
+    else:
+        ot_recv = ot_K_N.OTReceiver(ring, sender_pk, choice, t, BACKEND, base_log=params.base_log)
+
+    send_data(s, encode([ot_recv.scheme, 'STREAM'] if stream else ot_recv.scheme))
+
+    return ot_recv, choice
+
+
+def ot_1_out_of_N(s, ot_recv, dst=None):
+
+    A = decode(recv_data(s))
+    print('\nrecevied the random encryption (A)\n')
+
+    print('sending homomorphic encryption of A (B)\n')
+    B = ot_recv.homomorphic_encryption(A)
+    send_data(s, encode(B))
+
+    if dst is not None:
+        print('receiving streamed ciphertexts (keeping only the selected one)\n')
+        for i in range(ot_recv.t):
+            if i == ot_recv.e:
+                recv_stream(s, ot_recv.selected_key(), dst)
+            else:
+                skip_stream(s)
+        return dst
+
+    ct_list = decode(recv_data(s))
+    print('recevied symmetric AES ciphertexts:\n')
+    for i in range(len(ct_list)):
+        print(f'{i}. {ct_list[i].hex()}')
+
+    return ot_recv.decrypt(ct_list)
+
+
+def ot_K_out_of_N(s, ot_recv, dst=None):
+
+    A, T_A = decode(recv_data(s))
+    print('\nreceived the random encryption (A, T_A)\n')
+
+    print('sending homomorphic encryptions of A (U, T_B)\n')
+    U, T_B = ot_recv.homomorphic_encryption(A, T_A)
+    send_data(s, encode((U, T_B)))
+
+    sender_fake_sk = decode(recv_data(s))
+    print('received dummy secret key\nverification: ', end='')
+
+    if ot_recv.verify_fake_sk(sender_fake_sk):
+        print('[OK]\n')
+    else:
+        print('[Failed]\n')
+        raise AssertionError('invalid dummy secret key')
+
+    if dst is not None:
+        print('receiving streamed ciphertexts (keeping only the selected ones)')
+        keys = ot_recv.selected_keys(decode(recv_data(s)))
+        for i in range(ot_recv.t):
+            if i in ot_recv.e:
+                j = ot_recv.e.index(i)
+                recv_stream(s, keys[j], dst[j])
+            else:
+                skip_stream(s)
+        return dst
+
+    ct_list, V = decode(recv_data(s))
+    print('received symmetric AES ciphertexts:')
+    for i in range(len(ct_list)):
+        print(f'{i}. {ct_list[i].hex()}')
+
+    return ot_recv.decrypt(ct_list, V)
+
+
+def ot_1_out_of_N_pipelined(s, ot_recvs):
+
+    print(f'\nrunning {len(ot_recvs)} pipelined 1-out-of-N transfers\n')
+
+    return list(pipelined_receiver(s, ot_recvs))
+
+
+def main(host, port, out_dir=None, pipeline=False, trace_memory=False):
+
+    s = MeteredSocket(socket.socket())
+    s.connect((host, port))
+    print('\nconnected to sender\n')
+
+    if trace_memory:
+        tracemalloc.start()
+
+    try:
+
+        print('received parameters (ring, public key)')
+        ot_recv, choice = on_connect(s, out_dir is not None, pipeline)
+
+        if pipeline:
+            msg = ot_1_out_of_N_pipelined(s, ot_recv)
+            print(f'decrypted message(s):\n')
+            for i in range(len(msg)):
+                print(f'{choice[i]}. {msg[i].hex()}')
+
+        elif out_dir is not None:
+            paths = [os.path.join(out_dir, f'message_{c}.bin') for c in choice]
+            files = [open(path, 'wb') for path in paths]
+            try:
+                if ot_recv.scheme == '1_OUT_OF_N':
+                    ot_1_out_of_N(s, ot_recv, files[0])
+                elif ot_recv.scheme == 'K_OUT_OF_N':
+                    ot_K_out_of_N(s, ot_recv, files)
+            except Exception:
+                for f in files: f.close()
+                for path in paths: os.remove(path)
+                raise
+            finally:
+                for f in files: f.close()
+            print(f'\ndecrypted message(s) written to:\n')
+            for i in range(len(paths)):
+                print(f'{choice[i]}. {paths[i]}')
+
+        elif ot_recv.scheme == '1_OUT_OF_N':
+            msg = ot_1_out_of_N(s, ot_recv)
+            print(f'\ndecrypted message:\n{choice[0]}. {msg.hex()}\n')
+        
+        elif ot_recv.scheme == 'K_OUT_OF_N':
+            msg = ot_K_out_of_N(s, ot_recv)
+            print(f'\ndecrypted message(s):\n')
+            for i in range(len(msg)):
+                print(f'{choice[i]}. {msg[i].hex()}')
+
+    except Exception as e:
+        print(str(e))
+
+    print(f'\nwire: sent {s.sent} bytes, received {s.received} bytes')
+
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'peak client memory: {peak} bytes')
+
+    s.close()
+    print('\n[*] connection closed\n')
+
+
+if __name__ == '__main__':
+
+    flags = ['--pipeline', '--trace-memory']
+    args = [arg for arg in sys.argv[1:] if arg not in flags]
+    main('localhost', 3000, args[0] if args else None, '--pipeline' in sys.argv[1:], '--trace-memory' in sys.argv[1:])
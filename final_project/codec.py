@@ -0,0 +1,178 @@
+from collections import namedtuple
+from ciphertext import Ciphertext, PublicKey, SecretKey
+import numpy as np
+import struct
+
+
+MAGIC = b'RGSW'
+VERSION = 3
+
+T_INT, T_STR, T_BYTES, T_LIST, T_ARRAY, T_PARAMS, T_TYPED = range(7)
+
+TYPED = [Ciphertext, PublicKey, SecretKey]
+
+
+Params = namedtuple('Params', ['q', 'n', 'sigma', 'base_log'], defaults=[1])
+
+
+def packArray(arr, width):
+
+    vals = np.ascontiguousarray(arr, dtype=np.uint64).ravel()
+
+    if width in [8, 16, 32, 64]:
+        return vals.astype(f'<u{width >> 3}').tobytes()
+
+    bits = (vals[:, None] >> np.arange(width, dtype=np.uint64)) & 1
+    return np.packbits(bits.astype(np.uint8).ravel(), bitorder='little').tobytes()
+
+
+def unpackArray(buf, count, width):
+
+    if width in [8, 16, 32, 64]:
+        return np.frombuffer(buf, dtype=f'<u{width >> 3}', count=count).astype(np.int64)
+
+    bits = np.unpackbits(np.frombuffer(buf, dtype=np.uint8), count=count * width, bitorder='little')
+    bits = bits.reshape(count, width).astype(np.int64)
+
+    return bits @ (np.int64(1) << np.arange(width, dtype=np.int64))
+
+
+def packedSize(count, width):
+
+    return (count * width + 7) >> 3
+
+
+def encodeRecord(obj, out):
+
+    if isinstance(obj, Params):
+        out.append(struct.pack('<BQIdB', T_PARAMS, int(obj.q), int(obj.n), float(obj.sigma), int(obj.base_log)))
+
+    elif type(obj) in TYPED:
+        out.append(struct.pack('<BBQI', T_TYPED, TYPED.index(type(obj)), int(obj.q), int(obj.n)))
+        encodeRecord(obj.data, out)
+
+    elif isinstance(obj, (bool, int, np.integer)):
+        out.append(struct.pack('<Bq', T_INT, int(obj)))
+
+    elif isinstance(obj, str):
+        data = obj.encode()
+        out.append(struct.pack('<BI', T_STR, len(data)))
+        out.append(data)
+
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        out.append(struct.pack('<BI', T_BYTES, len(obj)))
+        out.append(bytes(obj))
+
+    elif isinstance(obj, np.ndarray):
+        assert obj.size == 0 or obj.min() >= 0, "arrays must be reduced mod q"
+        width = max(int(obj.max()).bit_length(), 1) if obj.size else 1
+        assert width <= 64
+        out.append(struct.pack(f'<BB{obj.ndim}IB', T_ARRAY, obj.ndim, *obj.shape, width))
+        out.append(packArray(obj, width))
+
+    elif isinstance(obj, (list, tuple)):
+        out.append(struct.pack('<BI', T_LIST, len(obj)))
+        for item in obj:
+            encodeRecord(item, out)
+
+    else:
+        raise TypeError(f'cannot encode {type(obj).__name__}')
+
+
+def unpackField(layout, buf, off):
+
+    size = struct.calcsize(layout)
+    if size > len(buf) - off:
+        raise ValueError(f'truncated record: needs {size} bytes, {len(buf) - off} left')
+
+    return struct.unpack_from(layout, buf, off), off + size
+
+
+def decodeRecord(buf, off, version=VERSION):
+
+    (tag,), off = unpackField('<B', buf, off)
+
+    if tag == T_PARAMS:
+        fields, off = unpackField('<QIdB' if version >= 3 else '<QId', buf, off)
+        return Params(*fields), off
+
+    if tag == T_TYPED:
+        (kind, q, n), off = unpackField('<BQI', buf, off)
+        if kind >= len(TYPED):
+            raise ValueError(f'unknown typed record kind {kind}')
+
+        data, off = decodeRecord(buf, off, version)
+        if not isinstance(data, np.ndarray) or data.ndim == 0 or data.shape[-1] != n:
+            raise ValueError(f'typed record does not wrap an array of degree {n}')
+
+        if TYPED[kind] is Ciphertext and data.size and data.max() <= np.iinfo(np.uint8).max:
+            data = data.astype(np.uint8)
+        return TYPED[kind](data, q, n), off
+
+    if tag == T_INT:
+        (value,), off = unpackField('<q', buf, off)
+        return value, off
+
+    if tag in [T_STR, T_BYTES]:
+        (size,), off = unpackField('<I', buf, off)
+        if size > len(buf) - off:
+            raise ValueError(f'string of {size} bytes, {len(buf) - off} left')
+
+        data = bytes(buf[off: off+size])
+        return (data.decode() if tag == T_STR else data), off + size
+
+    if tag == T_ARRAY:
+        (ndim,), off = unpackField('<B', buf, off)
+        shape, off = unpackField(f'<{ndim}I', buf, off)
+        (width,), off = unpackField('<B', buf, off)
+
+        if not 1 <= width <= 64:
+            raise ValueError(f'invalid array width {width}')
+
+        count = int(np.prod(shape, dtype=object))
+        size = packedSize(count, width)
+        if size > len(buf) - off:
+            raise ValueError(f'array of shape {shape} needs {size} bytes, {len(buf) - off} left')
+
+        arr = unpackArray(buf[off: off+size], count, width)
+        return arr.reshape(shape), off + size
+
+    if tag == T_LIST:
+        (count,), off = unpackField('<I', buf, off)
+        if count > len(buf) - off:
+            raise ValueError(f'list of {count} records, {len(buf) - off} bytes left')
+
+        items = []
+        for _ in range(count):
+            item, off = decodeRecord(buf, off, version)
+            items.append(item)
+        return items, off
+
+    raise ValueError(f'unknown record type {tag}')
+
+
+def encode(obj):
+
+    out = [MAGIC, bytes([VERSION])]
+    encodeRecord(obj, out)
+
+    return b''.join(out)
+
+
+def decode(data):
+
+    buf = memoryview(data)
+    if len(buf) < 5 or bytes(buf[:4]) != MAGIC:
+        raise ValueError('not an RGSW frame')
+    if not 1 <= buf[4] <= VERSION:
+        raise ValueError(f'unsupported codec version {buf[4]}')
+
+    try:
+        obj, off = decodeRecord(buf, 5, buf[4])
+    except (struct.error, IndexError, RecursionError) as e:
+        raise ValueError(f'malformed frame: {e}') from e
+
+    if off != len(buf):
+        raise ValueError('trailing bytes in frame')
+
+    return obj
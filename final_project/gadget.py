@@ -0,0 +1,76 @@
+from math import ceil
+import numpy as np
+
+
+class Gadget:
+
+
+    def __init__(self, q, k, base_log=1):
+
+        assert all([base_log >= 1, base_log < k])
+
+        self.q = q
+        self.k = k
+        self.base_log = base_log
+        self.ell = ceil(k / base_log)
+
+        self.mask = (1 << base_log) - 1
+        self.shifts = np.arange(self.ell, dtype=np.int64) * base_log
+        self.pows = np.array([(1 << int(s)) % q for s in self.shifts], dtype=np.int64)
+
+
+    def powers(self, mat):
+
+        *lead, nc, n = mat.shape
+        newmat = (mat[..., None, :] * self.pows[:, None]) % self.q
+
+        return newmat.reshape(*lead, nc * self.ell, n)
+
+
+    def decompose(self, mat):
+
+        *lead, nc, n = mat.shape
+        newmat = (mat[..., None, :] >> self.shifts[:, None]) & self.mask
+
+        return newmat.reshape(*lead, nc * self.ell, n)
+
+
+    def recompose(self, mat):
+
+        *lead, nc, n = mat.shape
+        assert nc % self.ell == 0
+
+        newmat = mat.reshape(*lead, nc // self.ell, self.ell, n)
+        newmat = (newmat * self.pows[:, None]).sum(axis=-2)
+
+        return newmat % self.q
+
+
+    def flatten(self, mat):
+
+        return self.decompose(self.recompose(mat))
+
+
+    def noiseBudget(self):
+
+        return self.q >> (self.base_log + 1)
+
+
+    def digitMoment(self):
+
+        return self.mask * (2 * self.mask + 1) / 6
+
+
+    def round(self, v):
+
+        pt = 0
+        known = 0
+
+        for j in range(self.ell-1, -1, -1):
+            shift = int(self.shifts[j]) + known
+            y = (v[..., j, :] - pt * int(self.pows[j])) % self.q
+            y = ((y + (1 << (shift-1))) >> shift) & ((1 << (self.k-shift)) - 1)
+            pt = pt + (y << known)
+            known = self.k - int(self.shifts[j])
+
+        return pt % self.q
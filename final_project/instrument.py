@@ -0,0 +1,294 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from importlib import import_module
+from inspect import iscoroutinefunction, isgeneratorfunction
+from time import perf_counter, process_time
+from threading import Lock
+from functools import wraps
+from math import prod
+import numpy as np
+import logging
+
+
+RGSW_METHODS = ['keygen', 'encrypt', 'decrypt', 'homMultConst', 'homAdd',
+                'matrixBitDecomp', 'matrixBitDecompInv', 'matrixFlatten', 'compress', 'expand',
+                'encryptBatch', 'decryptBatch', 'homMultConstBatch', 'homAddBatch', 'decryptMultConstBatch']
+
+OT_METHODS = ['random_encryption', 'generate_keys', 'lazy_keys', 'parallel_keys', 'generate_ciphertexts',
+              'iter_keys', 'iter_parallel_keys', 'key_range', 'blind_encryptions', 'encrypt_messages',
+              'random_encryption_batch', 'generate_ciphertexts_batch',
+              'random_encryption_packed', 'generate_ciphertexts_packed',
+              'homomorphic_encryption', 'homomorphic_encryption_batch', 'homomorphic_encryption_packed',
+              'verify_fake_sk', 'selected_key', 'selected_keys', 'decrypt', 'decrypt_batch', 'decrypt_packed']
+
+
+def ring_products(args, result):
+
+    mat1, mat2 = args[1], args[2]
+
+    if hasattr(mat1, 'nrows'):
+        return mat1.nrows() * mat1.ncols() * mat2.ncols()
+
+    lead = np.broadcast_shapes(np.shape(mat1)[:-3], np.shape(mat2)[:-3])
+
+    return prod(lead) * np.shape(mat1)[-3] * np.shape(mat1)[-2] * np.shape(mat2)[-2]
+
+
+def eval_products(args, result):
+
+    hat1, hat2 = np.shape(args[1]), np.shape(args[2])
+    lead = np.broadcast_shapes(hat1[:-4], hat2[:-4])
+
+    return prod(lead) * hat1[-4] * hat1[-3] * hat2[-3]
+
+
+def scalar_products(args, result):
+
+    ct, digits = args[1], np.shape(args[2])
+
+    if hasattr(ct, 'nrows'):
+        return ct.nrows() * digits[-1] * ct.ncols()
+
+    lead = np.broadcast_shapes(np.shape(ct)[:-3], digits[:-2])
+
+    return prod(lead) * np.shape(ct)[-3] * digits[-1] * np.shape(ct)[-2]
+
+
+SENT = ('bytes', lambda args, result: len(args[1]))
+INPUT = ('bytes', lambda args, result: len(args[0]))
+OUTPUT = ('bytes', lambda args, result: len(result))
+RING_PRODUCTS = ('ring_products', ring_products)
+EVAL_PRODUCTS = ('ring_products', eval_products)
+SCALAR_PRODUCTS = ('scalar_products', scalar_products)
+
+
+TARGETS = [
+    ('ringgsw', 'RingGSW', RGSW_METHODS, 'rgsw', None),
+    ('ringgsw_numpy', 'NumpyRingGSW', RGSW_METHODS, 'rgsw', None),
+    ('ringgsw', 'RingGSW', ['matrixMult'], 'rgsw', RING_PRODUCTS),
+    ('ringgsw_numpy', 'NumpyRingGSW', ['matrixMult'], 'rgsw', RING_PRODUCTS),
+    ('ringgsw_numpy', 'NumpyRingGSW', ['evalMult'], 'rgsw', EVAL_PRODUCTS),
+    ('ringgsw', 'RingGSW', ['scalarMult'], 'rgsw', SCALAR_PRODUCTS),
+    ('ringgsw_numpy', 'NumpyRingGSW', ['scalarMult'], 'rgsw', SCALAR_PRODUCTS),
+    ('ot_1_N', 'OTSender', OT_METHODS, 'ot_1_N', None),
+    ('ot_1_N', 'OTReceiver', OT_METHODS, 'ot_1_N', None),
+    ('ot_K_N', 'OTSender', OT_METHODS, 'ot_K_N', None),
+    ('ot_K_N', 'OTReceiver', OT_METHODS, 'ot_K_N', None),
+    ('ot_1_N', None, ['polynomialHash', 'polynomialHashes'], 'hash', None),
+    ('ot_K_N', None, ['polynomialHash', 'polynomialHashes'], 'hash', None),
+    ('server', None, ['encode'], 'codec', OUTPUT),
+    ('server', None, ['decode'], 'codec', INPUT),
+    ('client', None, ['encode'], 'codec', OUTPUT),
+    ('client', None, ['decode'], 'codec', INPUT),
+    ('server', None, ['send_data', 'async_send_data'], 'net', SENT),
+    ('server', None, ['recv_data', 'async_recv_data'], 'net', OUTPUT),
+    ('client', None, ['send_data'], 'net', SENT),
+    ('client', None, ['recv_data'], 'net', OUTPUT),
+    ('stream', None, ['send_data', 'async_send_data'], 'net', SENT),
+    ('stream', None, ['recv_data'], 'net', OUTPUT),
+    ('pipeline', None, ['send_data'], 'net', SENT),
+    ('pipeline', None, ['recv_data'], 'net', OUTPUT),
+    ('server', None, ['on_new_connect', 'ot_1_out_of_N', 'ot_K_out_of_N', 'serve_client'], 'server', None),
+    ('client', None, ['on_connect', 'ot_1_out_of_N', 'ot_K_out_of_N'], 'client', None)
+]
+
+AES_MODULES = ['ot_1_N', 'ot_K_N']
+
+
+sinks = []
+patched = []
+
+
+class CounterSink:
+
+
+    def __init__(self):
+
+        self.lock = Lock()
+        self.totals = defaultdict(lambda: {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'bytes': 0})
+
+
+    def record(self, phase, wall, cpu, size, unit='bytes'):
+
+        with self.lock:
+            entry = self.totals[phase]
+            entry['calls'] += 1
+            entry['wall'] += wall
+            entry['cpu'] += cpu
+            entry[unit] = entry.get(unit, 0) + size
+
+
+    def snapshot(self):
+
+        with self.lock:
+            return {phase: dict(entry) for phase, entry in self.totals.items()}
+
+
+    def reset(self):
+
+        with self.lock:
+            self.totals.clear()
+
+
+class LogSink:
+
+
+    def __init__(self, logger=None, level=logging.DEBUG):
+
+        self.logger = logger or logging.getLogger('final_project.instrument')
+        self.level = level
+
+
+    def record(self, phase, wall, cpu, size, unit='bytes'):
+
+        self.logger.log(self.level, '%s wall=%.6fs cpu=%.6fs %s=%d', phase, wall, cpu, unit, size)
+
+
+def emit(phase, wall, cpu, size=0, unit='bytes'):
+
+    for sink in sinks:
+        sink.record(phase, wall, cpu, size, unit)
+
+
+def timed(fn, phase, sized=None):
+
+    unit, size = sized or ('bytes', None)
+
+    if iscoroutinefunction(fn):
+
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            wall, cpu = perf_counter(), process_time()
+            result = await fn(*args, **kwargs)
+            emit(phase, perf_counter() - wall, process_time() - cpu, size(args, result) if size else 0, unit)
+            return result
+
+        return wrapper
+
+    if isgeneratorfunction(fn):
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            gen, done = fn(*args, **kwargs), object()
+            wall = cpu = 0.0
+            try:
+                while True:
+                    start, start_cpu = perf_counter(), process_time()
+                    item = next(gen, done)
+                    wall, cpu = wall + perf_counter() - start, cpu + process_time() - start_cpu
+                    if item is done:
+                        return
+                    yield item
+            finally:
+                gen.close()
+                emit(phase, wall, cpu, 0, unit)
+
+        return wrapper
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        wall, cpu = perf_counter(), process_time()
+        result = fn(*args, **kwargs)
+        emit(phase, perf_counter() - wall, process_time() - cpu, size(args, result) if size else 0, unit)
+        return result
+
+    return wrapper
+
+
+class TimedCipher:
+
+
+    def __init__(self, cipher):
+
+        self.cipher = cipher
+        self.encrypt = timed(cipher.encrypt, 'aes.encrypt', OUTPUT)
+        self.decrypt = timed(cipher.decrypt, 'aes.decrypt', OUTPUT)
+
+
+    def __getattr__(self, name):
+
+        return getattr(self.cipher, name)
+
+
+class TimedAES:
+
+
+    def __init__(self, aes):
+
+        self.aes = aes
+
+
+    def new(self, *args, **kwargs):
+
+        return TimedCipher(self.aes.new(*args, **kwargs))
+
+
+    def __getattr__(self, name):
+
+        return getattr(self.aes, name)
+
+
+def patch(owner, name, value):
+
+    patched.append((owner, name, vars(owner)[name]))
+    setattr(owner, name, value)
+
+
+def enable(*new_sinks, targets=TARGETS):
+
+    assert len(new_sinks) > 0, "at least one sink is required"
+
+    sinks.extend(new_sinks)
+    if patched:
+        return
+
+    for module, cls, names, group, sized in targets:
+        try:
+            owner = import_module(module)
+        except ImportError:
+            continue
+        if cls is not None:
+            owner = getattr(owner, cls)
+        for name in names:
+            if name in vars(owner):
+                patch(owner, name, timed(getattr(owner, name), f'{group}.{name}', sized))
+
+    for module in AES_MODULES:
+        try:
+            owner = import_module(module)
+        except ImportError:
+            continue
+        patch(owner, 'AES', TimedAES(owner.AES))
+
+
+def disable():
+
+    while patched:
+        owner, name, original = patched.pop()
+        setattr(owner, name, original)
+
+    sinks.clear()
+
+
+@contextmanager
+def instrumented(*new_sinks):
+
+    enable(*new_sinks)
+    try:
+        yield new_sinks
+    finally:
+        disable()
+
+
+@contextmanager
+def phase(name):
+
+    if not sinks:
+        yield
+        return
+
+    wall, cpu = perf_counter(), process_time()
+    try:
+        yield
+    finally:
+        emit(name, perf_counter() - wall, process_time() - cpu)
@@ -0,0 +1,99 @@
+from collections import namedtuple
+from threading import Thread, Event, Lock
+from queue import Queue, Empty, Full
+from ringgsw import RingGSW
+
+
+KeyMaterial = namedtuple('KeyMaterial', ['sk', 'pk', 'fake_sk', 'a', 'A'])
+
+
+class KeyPool:
+
+
+    def __init__(self, ring, sigma=5, backend='sage', size=4, reuse=1, **params):
+
+        assert all([size > 0, reuse > 0])
+
+        self.ring = ring
+        self.sigma = sigma
+        self.rgsw = RingGSW(self.ring, sigma, backend, **params)
+
+        self.size = size
+        self.reuse = reuse
+        self.queue = Queue(maxsize=size)
+
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+        self.stopped = Event()
+        self.worker = None
+
+
+    def generate(self, keys=None):
+
+        if keys is None:
+            sk, cpk = self.rgsw.keygenSeeded()
+            fake_sk, _ = self.rgsw.keygenSeeded()
+        else:
+            sk, cpk, fake_sk = keys
+
+        seed, a = self.rgsw.seededElement()
+        A = self.rgsw.encrypt(a, self.rgsw.expandKey(cpk))
+
+        return KeyMaterial(sk, cpk, fake_sk, seed, A)
+
+
+    def fill(self):
+
+        while not self.stopped.is_set():
+
+            material = self.generate()
+            keys = material[:3]
+            uses = 0
+
+            while uses < self.reuse and not self.stopped.is_set():
+                try:
+                    self.queue.put(material, timeout=0.1)
+                except Full:
+                    continue
+                uses += 1
+                if uses < self.reuse:
+                    material = self.generate(keys)
+
+
+    def start(self):
+
+        if self.worker is None:
+            self.stopped.clear()
+            self.worker = Thread(target=self.fill, daemon=True)
+            self.worker.start()
+
+        return self
+
+
+    def close(self):
+
+        self.stopped.set()
+
+        if self.worker is not None:
+            self.worker.join()
+            self.worker = None
+
+
+    def get(self):
+
+        try:
+            material = self.queue.get_nowait()
+            with self.lock: self.hits += 1
+        except Empty:
+            material = self.generate()
+            with self.lock: self.misses += 1
+
+        return material
+
+
+    def stats(self):
+
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'available': self.queue.qsize()}
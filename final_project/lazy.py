@@ -0,0 +1,62 @@
+class LazyCiphertext:
+
+
+    def __init__(self, rgsw, op, args):
+
+        assert op in ['leaf', 'add', 'mult']
+
+        self.rgsw = rgsw
+        self.op = op
+        self.args = args
+        self.value = None
+
+
+    def lift(self, other):
+
+        if isinstance(other, LazyCiphertext):
+            assert other.rgsw is self.rgsw
+            return other
+
+        return LazyCiphertext(self.rgsw, 'leaf', (other,))
+
+
+    def __add__(self, other):
+
+        return LazyCiphertext(self.rgsw, 'add', (self, self.lift(other)))
+
+
+    def __radd__(self, other):
+
+        return LazyCiphertext(self.rgsw, 'add', (self.lift(other), self))
+
+
+    def multConst(self, g):
+
+        return LazyCiphertext(self.rgsw, 'mult', (self, g))
+
+
+    def compressed(self):
+
+        if self.value is not None:
+            return self.value
+
+        if self.op == 'leaf':
+            value = self.rgsw.compress(self.args[0])
+        elif self.op == 'add':
+            value = self.rgsw.compressedAdd(self.args[0].compressed(), self.args[1].compressed())
+        else:
+            value = self.rgsw.compressedMultConst(self.args[0].compressed(), self.args[1])
+
+        self.value = value
+
+        return value
+
+
+    def evaluate(self):
+
+        return self.rgsw.expand(self.compressed())
+
+
+    def decrypt(self, sk):
+
+        return self.rgsw.decryptCompressed(self.compressed(), sk)
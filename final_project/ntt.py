@@ -0,0 +1,176 @@
+from math import ceil, log2
+import numpy as np
+
+
+def isPrime(p):
+
+    if p < 2:
+        return False
+
+    for b in [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37]:
+        if p % b == 0:
+            return p == b
+
+    d, s = p - 1, 0
+    while d % 2 == 0:
+        d, s = d >> 1, s + 1
+
+    for b in [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37]:
+        x = pow(b, d, p)
+        if x in [1, p-1]:
+            continue
+        for _ in range(s - 1):
+            x = x * x % p
+            if x == p-1:
+                break
+        else:
+            return False
+
+    return True
+
+
+def nttPrimes(n, count, bits=26):
+
+    assert bits <= 30
+
+    primes = []
+    p = ((1<<bits) - 1) // (2*n) * (2*n) + 1
+
+    while len(primes) < count:
+        assert p > 2*n, "not enough NTT-friendly primes"
+        if isPrime(p):
+            primes.append(p)
+        p -= 2*n
+
+    return primes
+
+
+def primitiveRoot(p, n):
+
+    assert (p - 1) % (2*n) == 0
+
+    for x in range(2, p):
+        psi = pow(x, (p-1) // (2*n), p)
+        if pow(psi, n, p) == p-1:
+            return psi
+
+
+class NegacyclicNTT:
+
+
+    def __init__(self, q, n, primes):
+
+        assert all([n > 1, n & (n-1) == 0])
+        assert all([(p - 1) % (2*n) == 0 and isPrime(p) for p in primes])
+        assert all([p < 1<<30 for p in primes])
+
+        self.q = q
+        self.n = n
+        self.L = len(primes)
+        self.primes = primes
+        self.P = np.array(primes, dtype=np.int64)[:, None]
+
+        logn = n.bit_length() - 1
+        self.bitrev = np.array([int(f'{i:0{logn}b}'[::-1], 2) for i in range(n)])
+
+        psi = [primitiveRoot(p, n) for p in primes]
+        psi_inv = [pow(s, -1, p) for s, p in zip(psi, primes)]
+
+        n_inv = np.array([pow(n, -1, p) for p in primes])[:, None]
+        self.psi = self.powers(psi, n)
+        self.psi_inv = self.powers(psi_inv, n) * n_inv % self.P
+
+        self.roots = self.stageRoots([s * s % p for s, p in zip(psi, primes)])
+        self.roots_inv = self.stageRoots([s * s % p for s, p in zip(psi_inv, primes)])
+
+        self.garner = [[pow(primes[j], -1, primes[i]) for j in range(i)] for i in range(self.L)]
+        self.weights = []
+        w = 1
+        for p in primes:
+            self.weights.append(w % q)
+            w *= p
+        self.modulus = w
+
+
+    def powers(self, base, length):
+
+        return np.array([[pow(b, i, p) for i in range(length)] for b, p in zip(base, self.primes)], dtype=np.int64)
+
+
+    def stageRoots(self, omega):
+
+        roots = []
+        length = 2
+
+        while length <= self.n:
+            step = [pow(w, self.n // length, p) for w, p in zip(omega, self.primes)]
+            roots.append(self.powers(step, length >> 1)[:, None, :])
+            length <<= 1
+
+        return roots
+
+
+    def transform(self, a, roots):
+
+        a = a[..., self.bitrev]
+        P = self.P[..., None]
+        lead = a.shape[:-1]
+        length = 2
+
+        for w in roots:
+            half = length >> 1
+            a = a.reshape(*lead[:-1], self.L, self.n // length, length)
+            u, v = a[..., :half], a[..., half:] * w % P
+            a = np.concatenate(((u + v) % P, (u - v) % P), axis=-1)
+            length <<= 1
+
+        return a.reshape(*lead, self.n)
+
+
+    def forward(self, a):
+
+        a = np.asarray(a, dtype=np.int64)[..., None, :] % self.P
+
+        return self.transform(a * self.psi % self.P, self.roots)
+
+
+    def inverse(self, a):
+
+        return self.transform(a, self.roots_inv) * self.psi_inv % self.P
+
+
+    def matmul(self, a_hat, b_hat):
+
+        assert a_hat.shape[-3] * max(self.primes)**2 < 1<<63
+
+        return np.einsum('...rmLn,...mcLn->...rcLn', a_hat, b_hat) % self.P
+
+
+    def reconstruct(self, c, bound):
+
+        shift = -(-bound // self.q) * self.q
+        assert shift + bound < self.modulus, "not enough primes for the product bound"
+
+        c = (c + np.array([shift % p for p in self.primes])[:, None]) % self.P
+        digits = []
+        res = 0
+
+        for i in range(self.L):
+            p = self.primes[i]
+            v = c[..., i, :]
+            for j in range(i):
+                v = (v - digits[j]) * self.garner[i][j] % p
+            digits.append(v)
+            if self.q >= 1<<28:
+                v = v.astype(object)
+            res = (res + v * self.weights[i]) % self.q
+
+        return res
+
+
+def primesFor(q, n, m, bits=26):
+
+    bound = m * n * (q - 1)**2
+    count = ceil((log2(2 * bound + 1) + 1) / (bits - 1))
+
+    return nttPrimes(n, count, bits)
@@ -1,94 +1,292 @@
-from Crypto.Cipher import AES
-from Crypto.Util.Padding import pad, unpad
-from utils import polynomialHash
-from ringgsw import RingGSW
-
-
-class OTSender:
-
-    
-    def __init__(self, ring, msg_list, sigma=5):
-
-        self.ring = ring
-        self.msg_list = msg_list
-        self.t = len(self.msg_list)
-        
-        self.rgsw = RingGSW(self.ring, sigma)
-        self.sk, self.pk = self.rgsw.keygen()
-
-        self.scheme = '1_OUT_OF_N'
-    
-
-    def random_encryption(self):
-        
-        self.a = self.ring.random_element()
-        A = self.rgsw.encrypt(self.a, self.pk)
-        
-        return A
-
-
-    def generate_ciphertexts(self, B):
-        
-        d = self.rgsw.decrypt(B, self.sk)
-        ct_list = []
-        
-        for i in range(self.t):
-            key = polynomialHash(d - (i * self.a))
-            aes = AES.new(key, AES.MODE_CBC)
-            ct = aes.encrypt(pad(self.msg_list[i], AES.block_size))
-            ct_list.append(aes.iv + ct)
-        
-        return ct_list
-
-    
-class OTReceiver:
-    
-    
-    def __init__(self, ring, pk, e, t):
-        
-        assert all([e >= 0, e < t])
-        
-        self.ring = ring
-        self.rgsw = RingGSW(self.ring)
-        self.pk = pk
-
-        self.e = e
-        self.t = t
-
-        self.scheme = '1_OUT_OF_N'
-
-        
-    def homomorphic_encryption(self, A):
-        
-        self.b = self.ring.random_element()
-        B = self.rgsw.encrypt(self.b, self.pk)
-        
-        e_A = self.rgsw.homMultConst(A, self.e)
-        B = self.rgsw.homAdd(e_A, B)
-        
-        return B
-
-    
-    def decrypt(self, ct_list):
-        
-        key = polynomialHash(self.b)
-        ct = ct_list[self.e]
-        iv, ct = ct[:AES.block_size], ct[AES.block_size:]
-        
-        aes = AES.new(key, AES.MODE_CBC, iv)
-        m_e = unpad(aes.decrypt(ct), AES.block_size)
-        
-        return m_e
-
-
-def obliviousTransfer(ring, msg_list, e, sigma=5):
-
-    sender = OTSender(ring, msg_list, sigma)
-    client = OTReceiver(ring, sender.pk, e, sender.t)
-    
-    A = sender.random_encryption()
-    B = client.homomorphic_encryption(A)
-    ct_list = sender.generate_ciphertexts(B)
-    m_e = client.decrypt(ct_list)
-
-    return msg_list[e] == m_e
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad, unpad
+from utils import polynomialHash, polynomialHashes
+from ringgsw import RingGSW
+from math import ceil
+from itertools import islice
+
+
+KEY_CHUNK = 1024
+
+
+class OTSender:
+
+    
+    def __init__(self, ring, msg_list, sigma=5, backend='sage', material=None, block=None, **params):
+
+        self.ring = ring
+        self.msg_list = msg_list
+        self.t = len(self.msg_list)
+        
+        self.rgsw = RingGSW(self.ring, sigma, backend, **params)
+        self.block = block or packingBlock(self.rgsw)
+        self.precomputed = None
+
+        if material is None:
+            self.sk, self.cpk = self.rgsw.keygenSeeded()
+        else:
+            self.sk, self.cpk = material.sk, material.pk
+            self.precomputed = (self.rgsw.expandElement(material.a), material.A)
+
+        self.pk = self.rgsw.expandKey(self.cpk)
+
+        self.scheme = '1_OUT_OF_N'
+    
+
+    def random_encryption(self):
+
+        if self.precomputed is not None:
+            (self.a, A), self.precomputed = self.precomputed, None
+            return A
+        
+        self.a = self.rgsw.randomElement()
+        A = self.rgsw.encrypt(self.a, self.pk)
+        
+        return A
+
+
+    def generate_keys(self, B):
+
+        return list(self.iter_keys(B))
+
+
+    def key_range(self, B, start, stop):
+
+        return list(self.iter_keys(B, start=start, stop=stop))
+
+
+    def iter_keys(self, B, chunk=KEY_CHUNK, start=0, stop=None):
+
+        d = self.rgsw.decrypt(B, self.sk)
+        stop = self.t if stop is None else stop
+
+        for lo in range(start, stop, chunk):
+            hi = min(lo + chunk, stop)
+            yield from polynomialHashes([self.rgsw.reduce(d - (i * self.a)) for i in range(lo, hi)])
+
+
+    def generate_ciphertexts(self, B):
+
+        return self.encrypt_messages(self.iter_keys(B))
+
+
+    def encrypt_messages(self, keys):
+
+        for key, msg in zip(keys, self.msg_list):
+            aes = AES.new(key, AES.MODE_CBC)
+            yield aes.iv + aes.encrypt(pad(bytes(msg), AES.block_size))
+
+
+    def random_encryption_batch(self, count):
+
+        self.a_batch = self.rgsw.randomElements(count)
+        A = self.rgsw.encryptBatch(self.a_batch, self.pk)
+
+        return A
+
+
+    def generate_ciphertexts_batch(self, B, msg_lists=None):
+
+        d = self.rgsw.decryptBatch(B, self.sk)
+        msg_lists = msg_lists or [self.msg_list] * len(d)
+        assert len(msg_lists) == len(d) == len(self.a_batch)
+
+        ct_lists = []
+
+        for j in range(len(d)):
+            keys = polynomialHashes([self.rgsw.reduce(d[j] - (i * self.a_batch[j])) for i in range(len(msg_lists[j]))])
+            ct_list = []
+            for i in range(len(msg_lists[j])):
+                aes = AES.new(keys[i], AES.MODE_CBC)
+                ct = aes.encrypt(pad(msg_lists[j][i], AES.block_size))
+                ct_list.append(aes.iv + ct)
+            ct_lists.append(ct_list)
+
+        return ct_lists
+
+
+    def random_encryption_packed(self):
+
+        self.a_block = [int(c) for c in self.rgsw.randomElement()][:self.block]
+        self.a = self.rgsw.reduce(self.a_block)
+        A = self.rgsw.encrypt(self.a, self.pk)
+
+        return A
+
+
+    def generate_ciphertexts_packed(self, B, slots=None):
+
+        slots = slots or self.rgsw.n // self.block
+        assert slots * self.block <= self.rgsw.n
+
+        d = [int(c) for c in self.rgsw.decrypt(B, self.sk)]
+        ct_lists = []
+
+        for j in range(slots):
+            d_j = d[j*self.block: (j+1)*self.block]
+            keys = polynomialHashes([[(u - i * v) % self.rgsw.q for u, v in zip(d_j, self.a_block)] for i in range(self.t)])
+            ct_list = []
+            for i in range(self.t):
+                aes = AES.new(keys[i], AES.MODE_CBC)
+                ct = aes.encrypt(pad(self.msg_list[i], AES.block_size))
+                ct_list.append(aes.iv + ct)
+            ct_lists.append(ct_list)
+
+        return ct_lists
+
+    
+class OTReceiver:
+    
+    
+    def __init__(self, ring, pk, e, t, backend='sage', block=None, **params):
+        
+        assert all([e >= 0, e < t])
+        
+        self.ring = ring
+        self.rgsw = RingGSW(self.ring, backend=backend, **params)
+        self.block = block or packingBlock(self.rgsw)
+        self.pk = self.rgsw.expandKey(pk)
+
+        self.e = e
+        self.t = t
+
+        self.scheme = '1_OUT_OF_N'
+
+        
+    def homomorphic_encryption(self, A):
+        
+        self.b = self.rgsw.randomElement()
+        B = self.rgsw.encrypt(self.b, self.pk)
+        
+        e_A = self.rgsw.lazy(A).multConst(self.e)
+        B = (e_A + B).evaluate()
+        
+        return B
+
+    
+    def selected_key(self):
+
+        return polynomialHash(self.b)
+
+
+    def decrypt(self, ct_list):
+        
+        key = self.selected_key()
+        ct = next(islice(ct_list, self.e, None))
+        iv, ct = ct[:AES.block_size], ct[AES.block_size:]
+        
+        aes = AES.new(key, AES.MODE_CBC, iv)
+        m_e = unpad(aes.decrypt(ct), AES.block_size)
+        
+        return m_e
+
+
+    def homomorphic_encryption_batch(self, A, choices):
+
+        assert all([w >= 0 and w < self.t for w in choices])
+        assert len(A) == len(choices)
+
+        self.choices = choices
+        self.b_batch = self.rgsw.randomElements(len(choices))
+        B = self.rgsw.encryptBatch(self.b_batch, self.pk)
+
+        e_A = self.rgsw.homMultConstBatch(A, choices)
+        B = self.rgsw.homAddBatch(e_A, B)
+
+        return B
+
+
+    def decrypt_batch(self, ct_lists):
+
+        keys = polynomialHashes(self.b_batch)
+        messages = []
+
+        for j in range(len(self.choices)):
+            ct = ct_lists[j][self.choices[j]]
+            iv, ct = ct[:AES.block_size], ct[AES.block_size:]
+
+            aes = AES.new(keys[j], AES.MODE_CBC, iv)
+            messages.append(unpad(aes.decrypt(ct), AES.block_size))
+
+        return messages
+
+
+    def homomorphic_encryption_packed(self, A, choices):
+
+        assert all([w >= 0 and w < self.t for w in choices])
+        assert len(choices) * self.block <= self.rgsw.n
+
+        self.choices = choices
+        self.b = self.rgsw.randomElement()
+        B = self.rgsw.encrypt(self.b, self.pk)
+
+        e = [0] * self.rgsw.n
+        for j in range(len(choices)):
+            e[j*self.block] = choices[j]
+
+        e_A = self.rgsw.homMultConst(A, self.rgsw.reduce(e))
+        B = self.rgsw.homAdd(e_A, B)
+
+        return B
+
+
+    def decrypt_packed(self, ct_lists):
+
+        b = [int(c) for c in self.b]
+        keys = polynomialHashes([b[j*self.block: (j+1)*self.block] for j in range(len(self.choices))])
+        messages = []
+
+        for j in range(len(self.choices)):
+            ct = ct_lists[j][self.choices[j]]
+            iv, ct = ct[:AES.block_size], ct[AES.block_size:]
+
+            aes = AES.new(keys[j], AES.MODE_CBC, iv)
+            messages.append(unpad(aes.decrypt(ct), AES.block_size))
+
+        return messages
+
+
+def packingBlock(rgsw, security=128):
+
+    return min(ceil(security / rgsw.k), rgsw.n)
+
+
+def obliviousTransfer(ring, msg_list, e, sigma=5, backend='sage', **params):
+
+    sender = OTSender(ring, msg_list, sigma, backend, **params)
+    client = OTReceiver(ring, sender.pk, e, sender.t, backend, **params)
+    
+    A = sender.random_encryption()
+    B = client.homomorphic_encryption(A)
+    ct_list = list(sender.generate_ciphertexts(B))
+    m_e = client.decrypt(ct_list)
+
+    return msg_list[e] == m_e
+
+
+def obliviousTransferBatch(ring, msg_lists, choices, sigma=5, backend='sage'):
+
+    assert len(msg_lists) == len(choices)
+
+    sender = OTSender(ring, msg_lists[0], sigma, backend)
+    client = OTReceiver(ring, sender.pk, choices[0], sender.t, backend)
+
+    A = sender.random_encryption_batch(len(choices))
+    B = client.homomorphic_encryption_batch(A, choices)
+    ct_lists = sender.generate_ciphertexts_batch(B, msg_lists)
+    messages = client.decrypt_batch(ct_lists)
+
+    return all([msg_lists[j][choices[j]] == messages[j] for j in range(len(choices))])
+
+
+def obliviousTransferPacked(ring, msg_list, choices, sigma=5, backend='sage', block=None):
+
+    sender = OTSender(ring, msg_list, sigma, backend, block=block)
+    client = OTReceiver(ring, sender.pk, choices[0], sender.t, backend, block=sender.block)
+
+    A = sender.random_encryption_packed()
+    B = client.homomorphic_encryption_packed(A, choices)
+    ct_lists = sender.generate_ciphertexts_packed(B, len(choices))
+    messages = client.decrypt_packed(ct_lists)
+
+    return all([msg_list[choices[j]] == messages[j] for j in range(len(choices))])
@@ -1,142 +1,245 @@
-from sage.all import Zmod
-from Crypto.Cipher import AES
-from Crypto.Util.Padding import pad, unpad
-from utils import polynomialHash
-from ringgsw import RingGSW
-
-
-class OTSender:
-
-
-    def __init__(self, ring, msg_list, sigma=5):
-
-        self.ring = ring
-        self.Zq = Zmod(self.ring.base().modulus())
-        self.msg_list = msg_list
-        self.t = len(self.msg_list)
-
-        self.rgsw = RingGSW(self.ring, sigma)
-        self.sk, self.pk = self.rgsw.keygen()
-        self.fake_sk, _ = self.rgsw.keygen()
-
-        self.scheme = 'K_OUT_OF_N'
-    
-    def random_encryption(self):
-
-        self.a = self.ring.random_element()
-        self.alpha_1 = self.Zq.random_element()
-        while self.alpha_1 < 1: self.alpha_1 = self.Zq.random_element()
-
-        A = self.rgsw.encrypt(self.a, self.pk)
-        T_A = self.rgsw.homMultConst(A, self.alpha_1)
-
-        return A, T_A
-    
-
-    def generate_ciphertexts(self, U, T_B):
-
-        self.alpha_2 = self.Zq.random_element()
-        while self.alpha_2 < 1: self.alpha_2 = self.Zq.random_element()
-
-        ct_list = []
-
-        for i in range(self.t):
-            X = self.rgsw.homMultConst(T_B, self.alpha_2 * (self.alpha_1 + i))
-            d = self.rgsw.decrypt(X, self.fake_sk)
-            key = polynomialHash(d)
-
-            aes = AES.new(key, AES.MODE_CBC)
-            ct = aes.encrypt(pad(self.msg_list[i], AES.block_size))
-            ct_list.append(aes.iv + ct)
-        
-        V = [self.rgsw.homMultConst(U_i, self.alpha_2) for U_i in U]
-
-        return ct_list, V
-
-
-class OTReceiver:
-
-
-    def __init__(self, ring, pk, e, t):
-
-        assert all([w >= 0 and w < t for w in e])
-
-        self.ring = ring
-        self.Zq = Zmod(self.ring.base().modulus())
-        self.rgsw = RingGSW(self.ring)
-        self.pk = pk
-        self.fake_sk = None
-
-        self.e = e
-        self.t = t
-
-        self.scheme = 'K_OUT_OF_N'
-    
-
-    def homomorphic_encryption(self, A, T_A):
-
-        self.beta = self.Zq.random_element()
-        while self.beta < 1: self.beta = self.Zq.random_element()
-
-        self.gamma = self.Zq.random_element()
-        while self.gamma < 1: self.gamma = self.Zq.random_element()
-        if self.gamma % 2 == 0: self.gamma += 1
-
-        T_B = self.rgsw.homMultConst(A, self.beta)
-        U = []
-
-        for i in range(len(self.e)):
-            U_i = self.rgsw.homMultConst(A, self.e[i])
-            U_i = self.rgsw.homAdd(T_A, U_i)
-            U_i = self.rgsw.homMultConst(U_i, self.beta * self.gamma)
-            U.append(U_i)
-        
-        return U, T_B
-
-
-    def verify_fake_sk(self, fake_sk):
-
-        self.fake_sk = fake_sk
-        
-        err = self.rgsw.matrixBitDecomp(self.pk) * self.fake_sk
-        err = err.row(0)[0]
-
-        for cf in err:
-            if cf >= self.rgsw.q>>2 and cf < 3*(self.rgsw.q>>2):
-                return True
-        
-        return False
-
-
-    def decrypt(self, ct_list, V):
-
-        messages = []
-
-        for i in range(len(self.e)):
-            X = self.rgsw.homMultConst(V[i], 1/self.gamma)
-            d = self.rgsw.decrypt(X, self.fake_sk)
-            key = polynomialHash(d)
-            ct = ct_list[self.e[i]]
-            iv, ct = ct[:AES.block_size], ct[AES.block_size:]
-
-            aes = AES.new(key, AES.MODE_CBC, iv)
-            msg = unpad(aes.decrypt(ct), AES.block_size)
-            messages.append(msg)
-        
-        return messages
-
-
-def obliviousTransfer(ring, msg_list, e, sigma=5):
-
-    sender = OTSender(ring, msg_list, sigma)
-    client = OTReceiver(ring, sender.pk, e, sender.t)
-
-    A, T_A = sender.random_encryption()
-    U, T_B = client.homomorphic_encryption(A, T_A)
-    
-    assert client.verify_fake_sk(sender.fake_sk), "invalid dummy secret key"
-
-    ct_list, V = sender.generate_ciphertexts(U, T_B)
-    messages = client.decrypt(ct_list, V)
-
-    assert all([msg_list[e[i]] == messages[i] for i in range(len(e))])
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import pad, unpad
+from utils import polynomialHashes
+from ringgsw import RingGSW
+from os import cpu_count
+from collections import deque
+
+
+KEY_CHUNK = 1024
+
+
+class OTSender:
+
+
+    def __init__(self, ring, msg_list, sigma=5, backend='sage', material=None, executor=None, chunks=None, **params):
+
+        self.ring = ring
+        self.msg_list = msg_list
+        self.t = len(self.msg_list)
+
+        self.rgsw = RingGSW(self.ring, sigma, backend, **params)
+        self.Zq = self.rgsw.Zq
+        self.precomputed = None
+
+        self.executor = executor
+        self.chunks = chunks or cpu_count() or 1
+
+        if material is None:
+            self.sk, self.cpk = self.rgsw.keygenSeeded()
+            self.fake_sk, _ = self.rgsw.keygenSeeded()
+        else:
+            self.sk, self.cpk, self.fake_sk = material.sk, material.pk, material.fake_sk
+            self.precomputed = (self.rgsw.expandElement(material.a), material.A)
+
+        self.pk = self.rgsw.expandKey(self.cpk)
+
+        self.scheme = 'K_OUT_OF_N'
+    
+    def random_encryption(self):
+
+        if self.precomputed is not None:
+            (self.a, A), self.precomputed = self.precomputed, None
+        else:
+            self.a = self.rgsw.randomElement()
+            A = self.rgsw.encrypt(self.a, self.pk)
+
+        self.alpha_1 = self.Zq.random_element()
+        while self.alpha_1 < 1: self.alpha_1 = self.Zq.random_element()
+
+        T_A = self.rgsw.homMultConst(A, self.alpha_1)
+
+        return A, T_A
+    
+
+    def generate_keys(self, U, T_B):
+
+        keys, V = self.lazy_keys(U, T_B)
+
+        return list(keys), V
+
+
+    def lazy_keys(self, U, T_B):
+
+        if self.executor is not None:
+            return self.parallel_keys(U, T_B)
+
+        V = self.blind_encryptions(U)
+
+        return self.iter_keys(T_B), V
+
+
+    def blind_encryptions(self, U):
+
+        self.alpha_2 = self.Zq.random_element()
+        while self.alpha_2 < 1: self.alpha_2 = self.Zq.random_element()
+
+        return [self.rgsw.homMultConst(U_i, self.alpha_2) for U_i in U]
+
+
+    def key_range(self, T_B, start, stop):
+
+        return list(self.iter_keys(T_B, start=start, stop=stop))
+
+
+    def iter_keys(self, T_B, chunk=KEY_CHUNK, start=0, stop=None):
+
+        stop = self.t if stop is None else stop
+
+        for lo in range(start, stop, chunk):
+            consts = [self.alpha_2 * (self.alpha_1 + i) for i in range(lo, min(lo + chunk, stop))]
+            yield from polynomialHashes(self.rgsw.decryptMultConstBatch(T_B, consts, self.fake_sk))
+
+
+    def parallel_keys(self, U, T_B):
+
+        self.alpha_2 = self.Zq.random_element()
+        while self.alpha_2 < 1: self.alpha_2 = self.Zq.random_element()
+
+        V_jobs = [self.executor.submit(mult_consts, self.rgsw, chunk, int(self.alpha_2))
+                  for chunk in split(list(U), self.chunks)]
+        V = [V_i for job in V_jobs for V_i in job.result()]
+
+        return self.iter_parallel_keys(T_B), V
+
+
+    def iter_parallel_keys(self, T_B, chunk=KEY_CHUNK):
+
+        chunk = min(chunk, -(-self.t // self.chunks))
+        jobs = deque()
+
+        for start in range(0, self.t, chunk):
+            consts = [int(self.alpha_2 * (self.alpha_1 + i)) for i in range(start, min(start + chunk, self.t))]
+            jobs.append(self.executor.submit(derive_keys, self.rgsw, T_B, self.fake_sk, consts))
+
+            if len(jobs) == self.chunks:
+                yield from jobs.popleft().result()
+
+        while jobs:
+            yield from jobs.popleft().result()
+
+
+    def generate_ciphertexts(self, U, T_B):
+
+        keys, V = self.lazy_keys(U, T_B)
+
+        return self.encrypt_messages(keys), V
+
+
+    def encrypt_messages(self, keys):
+
+        for key, msg in zip(keys, self.msg_list):
+            aes = AES.new(key, AES.MODE_CBC)
+            yield aes.iv + aes.encrypt(pad(bytes(msg), AES.block_size))
+
+
+class OTReceiver:
+
+
+    def __init__(self, ring, pk, e, t, backend='sage', **params):
+
+        assert all([w >= 0 and w < t for w in e])
+
+        self.ring = ring
+        self.rgsw = RingGSW(self.ring, backend=backend, **params)
+        self.Zq = self.rgsw.Zq
+        self.pk = self.rgsw.expandKey(pk)
+        self.fake_sk = None
+
+        self.e = e
+        self.t = t
+
+        self.scheme = 'K_OUT_OF_N'
+    
+
+    def homomorphic_encryption(self, A, T_A):
+
+        self.beta = self.Zq.random_element()
+        while self.beta < 1: self.beta = self.Zq.random_element()
+
+        self.gamma = self.Zq.random_element()
+        while self.gamma < 1: self.gamma = self.Zq.random_element()
+        if self.gamma % 2 == 0: self.gamma += 1
+
+        A, T_A = self.rgsw.lazy(A), self.rgsw.lazy(T_A)
+        T_B = A.multConst(self.beta).evaluate()
+        U = []
+
+        for i in range(len(self.e)):
+            U_i = T_A + A.multConst(self.e[i])
+            U_i = U_i.multConst(self.beta * self.gamma)
+            U.append(U_i.evaluate())
+        
+        return U, T_B
+
+
+    def verify_fake_sk(self, fake_sk):
+
+        self.fake_sk = fake_sk
+        
+        err = self.rgsw.matrixMult(self.rgsw.matrixBitDecomp(self.pk), self.fake_sk)
+        err = err[0][0]
+
+        for cf in err:
+            if cf >= self.rgsw.q>>2 and cf < 3*(self.rgsw.q>>2):
+                return True
+        
+        return False
+
+
+    def selected_keys(self, V):
+
+        d = [self.rgsw.lazy(V[i]).multConst(1/self.gamma).decrypt(self.fake_sk) for i in range(len(self.e))]
+
+        return polynomialHashes(d)
+
+
+    def decrypt(self, ct_list, V):
+
+        keys = self.selected_keys(V)
+        selected = {j: ct for j, ct in enumerate(ct_list) if j in self.e}
+        messages = []
+
+        for i in range(len(self.e)):
+            ct = selected[self.e[i]]
+            iv, ct = ct[:AES.block_size], ct[AES.block_size:]
+
+            aes = AES.new(keys[i], AES.MODE_CBC, iv)
+            msg = unpad(aes.decrypt(ct), AES.block_size)
+            messages.append(msg)
+        
+        return messages
+
+
+def split(items, chunks):
+
+    size = -(-len(items) // chunks)
+
+    return [items[i: i+size] for i in range(0, len(items), size)]
+
+
+def derive_keys(rgsw, T_B, fake_sk, consts):
+
+    return polynomialHashes(rgsw.decryptMultConstBatch(T_B, consts, fake_sk))
+
+
+def mult_consts(rgsw, cts, g):
+
+    return [rgsw.homMultConst(ct, g) for ct in cts]
+
+
+def obliviousTransfer(ring, msg_list, e, sigma=5, backend='sage', **params):
+
+    sender = OTSender(ring, msg_list, sigma, backend, **params)
+    client = OTReceiver(ring, sender.pk, e, sender.t, backend, **params)
+
+    A, T_A = sender.random_encryption()
+    U, T_B = client.homomorphic_encryption(A, T_A)
+    
+    assert client.verify_fake_sk(sender.fake_sk), "invalid dummy secret key"
+
+    ct_list, V = sender.generate_ciphertexts(U, T_B)
+    ct_list = list(ct_list)
+    messages = client.decrypt(ct_list, V)
+
+    assert all([msg_list[e[i]] == messages[i] for i in range(len(e))])
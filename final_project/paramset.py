@@ -0,0 +1,75 @@
+from collections import OrderedDict
+from threading import Lock, RLock
+
+
+class ParameterSet:
+
+
+    def __init__(self, q, n, sigma, cache_size=32):
+
+        self.q = q
+        self.n = n
+        self.sigma = sigma
+
+        self.constants = {}
+        self.lock = RLock()
+
+        self.cache_size = cache_size
+        self.gadgets = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    def constant(self, name, build):
+
+        with self.lock:
+            if name not in self.constants:
+                self.constants[name] = build()
+            return self.constants[name]
+
+
+    def scalarGadget(self, key, build):
+
+        with self.lock:
+            if key in self.gadgets:
+                self.gadgets.move_to_end(key)
+                self.hits += 1
+                return self.gadgets[key]
+
+        gct = build()
+
+        with self.lock:
+            self.misses += 1
+            self.gadgets[key] = gct
+            while len(self.gadgets) > self.cache_size:
+                self.gadgets.popitem(last=False)
+
+        return gct
+
+
+    def stats(self):
+
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'cached': len(self.gadgets), 'constants': len(self.constants)}
+
+
+REGISTRY = {}
+REGISTRY_LOCK = Lock()
+
+
+def parameterSet(q, n, sigma):
+
+    key = (int(q), int(n), float(sigma))
+
+    with REGISTRY_LOCK:
+        if key not in REGISTRY:
+            REGISTRY[key] = ParameterSet(*key)
+        return REGISTRY[key]
+
+
+def scalarKey(g, q):
+
+    try:
+        return int(g) % q
+    except (TypeError, ValueError, ArithmeticError):
+        return None
@@ -0,0 +1,88 @@
+from utils import send_data, recv_data
+from codec import encode, decode
+from threading import Thread, Lock, BoundedSemaphore
+from queue import Queue
+from copy import copy
+
+
+def fork_sender(ot_sender):
+
+    clone = copy(ot_sender)
+    clone.precomputed = None
+
+    return clone
+
+
+def pipelined_sender(c, ot_sender, count, window=4):
+
+    assert all([count > 0, window > 0])
+
+    template = fork_sender(ot_sender)
+    lock = Lock()
+    slots = BoundedSemaphore(window)
+    pending = Queue()
+
+    def produce():
+        try:
+            for j in range(count):
+                slots.acquire()
+                sender = ot_sender if j == 0 else fork_sender(template)
+                A = sender.random_encryption()
+                pending.put(sender)
+                with lock: send_data(c, encode(['A', j, A]))
+        except Exception as e:
+            pending.put(e)
+
+    producer = Thread(target=produce, daemon=True)
+    producer.start()
+
+    for j in range(count):
+        tag, i, B = decode(recv_data(c))
+        assert tag == 'B' and i == j, "out-of-order pipeline frame"
+
+        sender = pending.get()
+        if isinstance(sender, Exception):
+            raise sender
+
+        ct_list = list(sender.generate_ciphertexts(B))
+        with lock: send_data(c, encode(['CT', j, ct_list]))
+        slots.release()
+
+    producer.join()
+
+
+def pipelined_receiver(c, ot_receivers):
+
+    count = len(ot_receivers)
+    inbox = Queue()
+
+    def read():
+        try:
+            done = 0
+            while done < count:
+                frame = decode(recv_data(c))
+                inbox.put(frame)
+                done += frame[0] == 'CT'
+        except Exception as e:
+            inbox.put(e)
+
+    reader = Thread(target=read, daemon=True)
+    reader.start()
+    delivered = 0
+
+    while delivered < count:
+        item = inbox.get()
+        if isinstance(item, Exception):
+            raise item
+
+        tag, j, payload = item
+
+        if tag == 'A':
+            B = ot_receivers[j].homomorphic_encryption(payload)
+            send_data(c, encode(['B', j, B]))
+        else:
+            assert tag == 'CT' and j == delivered, "out-of-order pipeline frame"
+            yield ot_receivers[j].decrypt(payload)
+            delivered += 1
+
+    reader.join()
@@ -1,195 +1,385 @@
-from sage.all import var, RealDistribution, Integer, Matrix, vector
-from math import floor, ceil, log2
-from itertools import chain
-from random import randrange
-
-
-class RingGSW:
-
-    
-    def __init__(self, ring, sigma=5):
-    
-        assert ring.variable_name() == 'x'
-
-        self.Rq = ring
-        self.q = self.Rq.base().modulus()
-        self.n = self.Rq.modulus().degree()
-        
-        var('x')
-        assert self.Rq.modulus() == self.Rq(x**self.n + 1)
-        assert all([self.q > 1, floor(log2(self.q)) == ceil(log2(self.q))])
-        assert all([self.n > 1, floor(log2(self.q)) == ceil(log2(self.q))])
-
-        self.k = ceil(log2(self.q))
-        self.N = self.k << 1
-
-        self.gauss = RealDistribution('gaussian', sigma)
-
-
-    def powersOf2(self, pol):
-        
-        pol = self.Rq(pol)
-        vec = []
-        
-        for i in range(self.k):
-            tpol = self.Rq((1<<i) * pol)
-            vec.append(tpol)
-        
-        return vector(self.Rq, vec)
-
-    
-    def bitDecomp(self, pol):
-        
-        pol = self.Rq(pol)
-        vec = [self.Rq(0)] * self.k
-        
-        for i in range(self.n):
-            coeff = Integer(pol[i])
-            for j in range(self.k):
-                vec[j] += self.Rq((coeff & 1) * x**i)
-                coeff >>= 1
-        
-        return vector(self.Rq, vec)
-
-    
-    def bitDecompInv(self, vec):
-        
-        assert len(vec) == self.k
-        pol = self.Rq(0)
-        
-        for i in range(self.k):
-            pol += (1<<i) * vec[i]
-        pol = self.Rq(pol)
-
-        return pol
-
-    
-    def flatten(self, vec):
-        
-        assert len(vec) == self.k
-        
-        pol = self.bitDecompInv(vec)
-        vec = self.bitDecomp(pol)
-        
-        return vec
-
-    
-    def matrixPowersOf2(self, mat):
-        
-        nr, nc = mat.nrows(), mat.ncols()
-        newmat = Matrix(self.Rq, nr, [0] * nr * nc * self.k)
-        
-        for i in range(nr):
-            v = vector(self.Rq, [])
-            for j in range(nc):
-                u = self.powersOf2(mat[i][j])
-                v = vector(self.Rq, chain(v, u))
-            newmat[i, :] = v
-        
-        return newmat
-
-    
-    def matrixBitDecomp(self, mat):
-        
-        nr, nc = mat.nrows(), mat.ncols()
-        newmat = Matrix(self.Rq, nr, [0] * nr * nc * self.k)
-        
-        for i in range(nr):
-            v = vector(self.Rq, [])
-            for j in range(nc):
-                u = self.bitDecomp(mat[i][j])
-                v = vector(self.Rq, chain(v, u))
-            newmat[i, :] = v
-            
-        return newmat
-
-    
-    def matrixBitDecompInv(self, mat):
-        
-        nr, nc = mat.nrows(), mat.ncols()
-        assert nc % self.k == 0
-        
-        newmat = Matrix(self.Rq, nr, [0] * nr * (nc // self.k))
-        
-        for i in range(nr):
-            v = vector(self.Rq, [])
-            for j in range(0, nc, self.k):
-                u = self.bitDecompInv(mat[i, j:j+self.k].row(0))
-                u = vector(self.Rq, [u])
-                v = vector(self.Rq, chain(v, u))
-            newmat[i, :] = v
-            
-        return newmat
-
-    
-    def matrixFlatten(self, mat):
-        
-        assert mat.ncols() % self.k == 0
-        
-        newmat = self.matrixBitDecompInv(mat)
-        newmat = self.matrixBitDecomp(newmat)
-        
-        return newmat
-
-    
-    def keygen(self):
-        
-        t = self.Rq.random_element()
-        b1 = self.Rq.random_element()
-        
-        err = self.Rq([floor(self.gauss.get_random_element()) for _ in range(self.n)])
-        b2 = b1 * t + err
-        
-        sk = vector(self.Rq, chain(self.powersOf2(1), self.powersOf2(-t)))
-        sk = Matrix(self.Rq, self.N, sk)
-        pk = Matrix(self.Rq, 1, [b2, b1])
-        
-        return sk, pk
-
-
-    def encrypt(self, pt, pk):
-        
-        r = []
-        
-        for i in range(self.N):
-            pol = 0
-            for j in range(self.n):
-                pol += randrange(2) * x**j
-            r.append(pol)
-        
-        r = Matrix(self.Rq, self.N, r)
-        ct = self.Rq(pt) * Matrix.identity(self.N)
-        ct += self.matrixBitDecomp(r * pk)
-        ct = self.matrixFlatten(ct)
-        
-        return ct
-
-    
-    def decrypt(self, ct, sk):
-        
-        v = (ct[0:self.k, :] * sk).column(0)
-        pt = 0
-
-        for i in range(self.n):
-            zi = 0
-            for j in range(self.k-1, -1, -1):
-                b = v[j][i] - (zi<<j)
-                b = all([b >= self.q>>2, b < 3*(self.q>>2)])
-                zi += b << (self.k-1-j)
-            pt += zi * x**i
-        pt = self.Rq(pt)
-        
-        return pt
-
-    
-    def homMultConst(self, ct, g):
-        
-        gct = self.matrixFlatten(self.Rq(g) * Matrix.identity(self.N))
-        gct = self.matrixFlatten(gct * ct)
-        
-        return gct
-
-    
-    def homAdd(self, ct1, ct2):
-        
-        return self.matrixFlatten(ct1 + ct2)
+from sage.all import var, Integer, Matrix, vector, Zmod
+from paramset import parameterSet, scalarKey
+from sampler import Sampler, cdtTable, SEED_SIZE
+from lazy import LazyCiphertext
+from math import floor, ceil, log2
+from itertools import chain
+from functools import partial
+import numpy as np
+
+
+class RingGSW:
+
+
+    def __new__(cls, ring, sigma=5, backend='sage', **params):
+
+        if cls is RingGSW and backend == 'numpy':
+            from ringgsw_numpy import NumpyRingGSW
+            cls = NumpyRingGSW
+
+        return super().__new__(cls)
+
+    
+    def __init__(self, ring, sigma=5, backend='sage', base_log=1):
+    
+        assert ring.variable_name() == 'x'
+        assert backend in ['sage', 'numpy']
+        assert base_log == 1, "the sage backend only supports a binary gadget"
+
+        self.Rq = ring
+        self.q = self.Rq.base().modulus()
+        self.n = self.Rq.modulus().degree()
+        
+        var('x')
+        assert self.Rq.modulus() == self.Rq(x**self.n + 1)
+        assert all([self.q > 1, floor(log2(self.q)) == ceil(log2(self.q))])
+        assert all([self.n > 1, floor(log2(self.q)) == ceil(log2(self.q))])
+
+        self.k = ceil(log2(self.q))
+        self.N = self.k << 1
+        self.bitsType = np.int64 if self.k <= 56 else object
+
+        self.sigma = sigma
+        self.backend = backend
+        self.params = {}
+
+        self.paramset = parameterSet(self.q, self.n, sigma)
+        self.Zq = self.paramset.constant('Zq', lambda: Zmod(self.q))
+        self.sampler = Sampler(int(self.q), self.paramset.constant('cdt', lambda: cdtTable(sigma)))
+
+
+    def __reduce__(self):
+
+        return (partial(RingGSW, **self.params), (self.Rq, self.sigma, self.backend))
+
+
+    def powersOf2(self, pol):
+        
+        pol = self.Rq(pol)
+        vec = []
+        
+        for i in range(self.k):
+            tpol = self.Rq((1<<i) * pol)
+            vec.append(tpol)
+        
+        return vector(self.Rq, vec)
+
+    
+    def bitDecomp(self, pol):
+        
+        pol = self.Rq(pol)
+        vec = [self.Rq(0)] * self.k
+        
+        for i in range(self.n):
+            coeff = Integer(pol[i])
+            for j in range(self.k):
+                vec[j] += self.Rq((coeff & 1) * x**i)
+                coeff >>= 1
+        
+        return vector(self.Rq, vec)
+
+    
+    def bitDecompInv(self, vec):
+        
+        assert len(vec) == self.k
+        pol = self.Rq(0)
+        
+        for i in range(self.k):
+            pol += (1<<i) * vec[i]
+        pol = self.Rq(pol)
+
+        return pol
+
+    
+    def flatten(self, vec):
+        
+        assert len(vec) == self.k
+        
+        pol = self.bitDecompInv(vec)
+        vec = self.bitDecomp(pol)
+        
+        return vec
+
+    
+    def matrixPowersOf2(self, mat):
+        
+        nr, nc = mat.nrows(), mat.ncols()
+        newmat = Matrix(self.Rq, nr, [0] * nr * nc * self.k)
+        
+        for i in range(nr):
+            v = vector(self.Rq, [])
+            for j in range(nc):
+                u = self.powersOf2(mat[i][j])
+                v = vector(self.Rq, chain(v, u))
+            newmat[i, :] = v
+        
+        return newmat
+
+    
+    def matrixBitDecomp(self, mat):
+        
+        nr, nc = mat.nrows(), mat.ncols()
+        newmat = Matrix(self.Rq, nr, [0] * nr * nc * self.k)
+        
+        for i in range(nr):
+            v = vector(self.Rq, [])
+            for j in range(nc):
+                u = self.bitDecomp(mat[i][j])
+                v = vector(self.Rq, chain(v, u))
+            newmat[i, :] = v
+            
+        return newmat
+
+    
+    def matrixBitDecompInv(self, mat):
+        
+        nr, nc = mat.nrows(), mat.ncols()
+        assert nc % self.k == 0
+        
+        newmat = Matrix(self.Rq, nr, [0] * nr * (nc // self.k))
+        
+        for i in range(nr):
+            v = vector(self.Rq, [])
+            for j in range(0, nc, self.k):
+                u = self.bitDecompInv(mat[i, j:j+self.k].row(0))
+                u = vector(self.Rq, [u])
+                v = vector(self.Rq, chain(v, u))
+            newmat[i, :] = v
+            
+        return newmat
+
+    
+    def matrixFlatten(self, mat):
+        
+        assert mat.ncols() % self.k == 0
+        
+        newmat = self.matrixBitDecompInv(mat)
+        newmat = self.matrixBitDecomp(newmat)
+        
+        return newmat
+
+    
+    def keygen(self):
+
+        sk, cpk = self.keygenSeeded()
+
+        return sk, self.expandKey(cpk)
+
+
+    def keygenSeeded(self):
+        
+        t = self.randomElement()
+        seed, b1 = self.seededElement()
+        
+        err = self.Rq([int(c) for c in self.sampler.gaussian(self.n)])
+        b2 = b1 * t + err
+        
+        sk = vector(self.Rq, chain(self.powersOf2(1), self.powersOf2(-t)))
+        sk = Matrix(self.Rq, self.N, sk)
+        
+        return sk, (b2, seed)
+
+
+    def expandKey(self, cpk):
+
+        if not isinstance(cpk, (list, tuple)):
+            return cpk
+
+        b2, seed = cpk
+
+        return Matrix(self.Rq, 1, [self.reduce(b2), self.expandElement(seed)])
+
+
+    def randomElement(self):
+
+        return self.Rq([int(c) for c in self.sampler.uniform(self.n)])
+
+
+    def seededElement(self):
+
+        seed = self.sampler.randomBytes(SEED_SIZE)
+
+        return seed, self.expandElement(seed)
+
+
+    def expandElement(self, seed):
+
+        assert len(seed) == SEED_SIZE
+
+        return self.Rq([int(c) for c in Sampler(int(self.q), self.sampler.cdt, bytes(seed)).uniform(self.n)])
+
+
+    def reduce(self, pol):
+
+        return self.Rq(pol)
+
+
+    def matrixMult(self, mat1, mat2):
+
+        return mat1 * mat2
+
+
+    def encrypt(self, pt, pk):
+        
+        r = [self.Rq([int(c) for c in row]) for row in self.sampler.binary((self.N, self.n))]
+        
+        r = Matrix(self.Rq, self.N, r)
+        ct = self.Rq(pt) * self.identityMatrix()
+        ct += self.matrixBitDecomp(r * pk)
+        ct = self.matrixFlatten(ct)
+        
+        return ct
+
+    
+    def decrypt(self, ct, sk):
+
+        return self.decryptCompressed(self.compress(ct[0:self.k, :]), sk)
+
+
+    def decryptCompressed(self, mat, sk):
+
+        return self.decryptBatchCompressed([mat], sk)[0]
+
+
+    def decryptBatchCompressed(self, mats, sk):
+
+        return self.roundPhases(self.phases(mats, sk))
+
+
+    def phases(self, mats, sk):
+
+        s = sk[self.k, 0]
+        v = [[(mat[i, 0] + mat[i, 1] * s).list() for i in range(self.k)] for mat in mats]
+
+        return np.array([[[int(c) for c in pol] for pol in rows] for rows in v], dtype=self.bitsType)
+
+
+    def roundPhases(self, v):
+
+        return [self.Rq([int(c) for c in pt]) for pt in self.roundBits(v)]
+
+
+    def roundBits(self, v):
+
+        q = int(self.q)
+        pt = np.zeros(v.shape[:-2] + v.shape[-1:], dtype=v.dtype)
+        quarter = q >> 2
+
+        for j in range(self.k-1, -1, -1):
+            b = (v[..., j, :] - ((pt & ((1 << (self.k-j)) - 1)) << j)) % q
+            bit = (b >= quarter) & (b < 3*quarter)
+            pt += bit.astype(v.dtype) << (self.k-1-j)
+
+        return pt
+
+    
+    def identityMatrix(self):
+
+        return self.paramset.constant(('identity', self.N), lambda: Matrix.identity(self.N))
+
+
+    def gadgetMatrix(self, g):
+
+        return self.matrixFlatten(self.Rq(g) * self.identityMatrix())
+
+
+    def scalarDigits(self, g):
+
+        return self.paramset.scalarGadget(('sage', self.k, g), lambda: [[((g << i) % self.q >> j) & 1 for j in range(self.k)] for i in range(self.k)])
+
+
+    def scalarMult(self, ct, digits):
+
+        zero = vector(self.Rq, [0] * ct.ncols())
+        rows = []
+
+        for c in range(0, ct.nrows(), self.k):
+            for i in range(self.k):
+                rows.append(sum([ct.row(c + j) for j in range(self.k) if digits[i][j]], zero))
+
+        return Matrix(self.Rq, rows)
+
+
+    def compress(self, ct):
+
+        return self.matrixBitDecompInv(ct)
+
+
+    def expand(self, mat):
+
+        return self.matrixBitDecomp(mat)
+
+
+    def compressedAdd(self, mat1, mat2):
+
+        return mat1 + mat2
+
+
+    def compressedMultConst(self, mat, g):
+
+        key = scalarKey(g, self.q)
+
+        if key is None:
+            return self.gadgetMatrix(g) * mat
+
+        return self.scalarMult(mat, self.scalarDigits(key))
+
+
+    def lazy(self, ct):
+
+        return LazyCiphertext(self, 'leaf', (ct,))
+
+
+    def homMultConst(self, ct, g):
+
+        if not hasattr(ct, 'nrows'):
+            return self.matrixFlatten(self.gadgetMatrix(g) * self.Rq(ct))
+        
+        gct = self.compressedMultConst(self.compress(ct), g)
+        gct = self.expand(gct)
+        
+        return gct
+
+    
+    def homAdd(self, ct1, ct2):
+        
+        return self.matrixFlatten(ct1 + ct2)
+
+
+    def randomElements(self, count):
+
+        return [self.randomElement() for _ in range(count)]
+
+
+    def encryptBatch(self, pts, pk):
+
+        return [self.encrypt(pt, pk) for pt in pts]
+
+
+    def decryptBatch(self, cts, sk):
+
+        return self.decryptBatchCompressed([self.compress(ct[0:self.k, :]) for ct in cts], sk)
+
+
+    def decryptMultConstBatch(self, ct, gs, sk):
+
+        keys = [scalarKey(g, self.q) for g in gs]
+
+        if None in keys:
+            mat = self.compress(ct)
+            return self.decryptBatchCompressed([self.compressedMultConst(mat, g) for g in gs], sk)
+
+        digits = np.array([self.scalarDigits(key) for key in keys], dtype=self.bitsType)
+        v = self.phases([self.compress(ct[0:self.k, :])], sk)[0]
+
+        return self.roundPhases((digits @ v) % int(self.q))
+
+
+    def homMultConstBatch(self, cts, gs):
+
+        return [self.homMultConst(ct, g) for ct, g in zip(cts, gs)]
+
+
+    def homAddBatch(self, cts1, cts2):
+
+        return [self.homAdd(ct1, ct2) for ct1, ct2 in zip(cts1, cts2)]
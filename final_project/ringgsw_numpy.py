@@ -0,0 +1,423 @@
+from sage.all import Matrix, vector
+from ringgsw import RingGSW
+from ntt import NegacyclicNTT, primesFor
+from gadget import Gadget
+from ciphertext import RingArray, Ciphertext, PublicKey, SecretKey, unwrap
+from paramset import scalarKey
+from sampler import Sampler, SEED_SIZE
+from math import sqrt
+import numpy as np
+
+
+NOISE_TAIL = 6
+
+
+class NumpyRingGSW(RingGSW):
+
+
+    def __init__(self, ring, sigma=5, backend='numpy', mult='auto', primes=None, base_log=1):
+
+        super().__init__(ring, sigma, backend)
+        assert mult in ['auto', 'schoolbook', 'ntt']
+
+        self.q = int(self.q)
+        self.n = int(self.n)
+        self.params = {'mult': mult, 'primes': primes, 'base_log': base_log}
+
+        self.gadget = self.paramset.constant(('gadget', base_log), lambda: Gadget(self.q, self.k, base_log))
+        self.ell = self.gadget.ell
+        self.N = self.ell << 1
+        assert self.noiseBound() < self.gadget.noiseBudget(), f"base 2^{base_log} leaves no noise budget at q=2^{self.k}, n={self.n}"
+
+        self.dtype = np.int64 if self.q.bit_length() <= 28 else object
+        self.digitType = next(t for t in [np.uint8, np.uint16, np.uint32, np.int64] if np.iinfo(t).max >= self.gadget.mask)
+
+        if mult == 'auto':
+            mult = 'ntt' if self.n >= 64 else 'schoolbook'
+
+        self.mult = mult
+        self.ntt = None
+
+        if self.mult == 'ntt':
+            primes = tuple(primes or self.paramset.constant(('primes', self.N), lambda: primesFor(self.q, self.n, self.N)))
+            self.ntt = self.paramset.constant(('ntt', primes), lambda: NegacyclicNTT(self.q, self.n, list(primes)))
+
+
+    def noiseBound(self, depth=1):
+
+        fresh = self.sigma * sqrt(self.n / 2)
+
+        return NOISE_TAIL * fresh * sqrt(self.ell * self.gadget.digitMoment()) ** depth
+
+
+    def array(self, obj):
+
+        arr = unwrap(obj)
+
+        return arr.astype(self.dtype) if arr.dtype.kind == 'u' else arr
+
+
+    def ciphertext(self, bits):
+
+        return Ciphertext(bits.astype(self.digitType), self.q, self.n)
+
+
+    def toArray(self, obj):
+
+        obj = unwrap(obj)
+
+        if isinstance(obj, np.ndarray):
+            return obj.astype(self.dtype) % self.q
+
+        if hasattr(obj, 'nrows'):
+            return np.array([[self.poly(c) for c in row] for row in obj.rows()], dtype=self.dtype)
+
+        if hasattr(obj, 'parent') and obj.parent() is self.Rq:
+            return self.poly(obj)
+
+        return np.array([self.poly(c) for c in obj], dtype=self.dtype)
+
+
+    def toRing(self, arr):
+
+        arr = unwrap(arr)
+
+        if arr.ndim == 1:
+            return self.Rq([int(c) for c in arr])
+
+        if arr.ndim == 2:
+            return vector(self.Rq, [self.toRing(a) for a in arr])
+
+        nr, nc = arr.shape[:2]
+        return Matrix(self.Rq, nr, nc, [self.toRing(a) for row in arr for a in row])
+
+
+    def poly(self, pol):
+
+        if isinstance(pol, np.ndarray):
+            return pol.astype(self.dtype) % self.q
+
+        if isinstance(pol, (list, tuple)):
+            coeffs = [int(c) for c in pol]
+        elif hasattr(pol, 'list'):
+            coeffs = [int(c) for c in pol.list()]
+        else:
+            coeffs = [int(pol)]
+
+        arr = np.zeros(self.n, dtype=self.dtype)
+        arr[:len(coeffs)] = coeffs
+
+        return arr % self.q
+
+
+    def powersOf2(self, pol):
+
+        return self.gadget.powers(self.poly(pol)[None, :])
+
+
+    def bitDecomp(self, pol):
+
+        return self.gadget.decompose(self.poly(pol)[None, :])
+
+
+    def bitDecompInv(self, vec):
+
+        assert len(vec) == self.ell
+
+        return self.gadget.recompose(vec)[0]
+
+
+    def flatten(self, vec):
+
+        assert len(vec) == self.ell
+
+        return self.gadget.flatten(vec)
+
+
+    def matrixPowersOf2(self, mat):
+
+        return self.gadget.powers(self.array(mat))
+
+
+    def matrixBitDecomp(self, mat):
+
+        return self.gadget.decompose(self.array(mat))
+
+
+    def matrixBitDecompInv(self, mat):
+
+        return self.gadget.recompose(self.array(mat))
+
+
+    def matrixFlatten(self, mat):
+
+        return self.ciphertext(self.gadget.flatten(self.array(mat)))
+
+
+    def toEval(self, mat):
+
+        if not isinstance(mat, RingArray):
+            return self.ntt.forward(mat)
+
+        return mat.cached(('eval', self.ntt), lambda: self.ntt.forward(mat.data))
+
+
+    def secretEval(self, sk):
+
+        s = lambda: self.ntt.forward(unwrap(sk)[self.ell, 0][None, None, :])
+
+        return sk.cached(('secret', self.ntt), s) if isinstance(sk, RingArray) else s()
+
+
+    def matrixMult(self, mat1, mat2):
+
+        *lead, nr, nm, n = mat1.shape
+        nc = mat2.shape[-2]
+        assert mat2.shape[-3] == nm
+
+        if self.ntt is not None:
+            return self.evalMult(self.toEval(mat1), self.toEval(mat2))
+
+        mat1, mat2 = self.array(mat1), self.array(mat2)
+
+        rot = mat2.reshape(*mat2.shape[:-2], nc * n)
+        prod = 0
+
+        for i in range(n):
+            prod = (prod + mat1[..., i] @ rot) % self.q
+            rot = rot.reshape(*mat2.shape[:-2], nc, n)
+            rot = np.concatenate((-rot[..., -1:], rot[..., :-1]), axis=-1)
+            rot = rot.reshape(*mat2.shape[:-2], nc * n)
+
+        return prod.reshape(*prod.shape[:-1], nc, n)
+
+
+    def evalMult(self, hat1, hat2):
+
+        prod = self.ntt.matmul(hat1, hat2)
+
+        return self.ntt.reconstruct(self.ntt.inverse(prod), hat1.shape[-3] * self.n * (self.q-1)**2)
+
+
+    def polyMult(self, pol1, pol2):
+
+        return self.matrixMult(pol1[None, None, :], pol2[None, None, :])[0, 0]
+
+
+    def polys(self, pols):
+
+        if isinstance(pols, np.ndarray):
+            return self.poly(pols)
+
+        return np.stack([self.poly(pol) for pol in pols])
+
+
+    def identity(self, pol):
+
+        pol = self.poly(pol)
+        diag = np.arange(self.N)
+
+        ident = np.zeros((*pol.shape[:-1], self.N, self.N, self.n), dtype=self.dtype)
+        ident[..., diag, diag, :] = pol[..., None, :]
+
+        return ident
+
+
+    def keygenSeeded(self):
+
+        t = self.randomElement()
+        seed, b1 = self.seededElement()
+
+        err = self.sampler.gaussian(self.n).astype(self.dtype)
+        b2 = (self.polyMult(b1, t) + err) % self.q
+
+        sk = np.concatenate((self.powersOf2(1), self.powersOf2(-t)))
+        sk = sk[:, None, :]
+
+        return SecretKey(sk, self.q, self.n), (b2, seed)
+
+
+    def expandKey(self, cpk):
+
+        if not isinstance(cpk, (list, tuple)):
+            return cpk
+
+        b2, seed = cpk
+        pk = np.stack((self.poly(b2), self.expandElement(seed)))[None, :, :]
+
+        return PublicKey(pk, self.q, self.n)
+
+
+    def randomElement(self):
+
+        return self.sampler.uniform(self.n).astype(self.dtype)
+
+
+    def expandElement(self, seed):
+
+        assert len(seed) == SEED_SIZE
+
+        return Sampler(self.q, self.sampler.cdt, bytes(seed)).uniform(self.n).astype(self.dtype)
+
+
+    def reduce(self, pol):
+
+        return self.poly(pol)
+
+
+    def randomElements(self, count):
+
+        return self.sampler.uniform((count, self.n)).astype(self.dtype)
+
+
+    def encrypt(self, pt, pk):
+
+        pt = self.poly(pt)
+        r = self.sampler.binary((*pt.shape[:-1], self.N, 1, self.n)).astype(self.dtype)
+
+        ct = self.identity(pt)
+        ct += self.matrixBitDecomp(self.matrixMult(r, pk))
+        return self.matrixFlatten(ct)
+
+
+    def decrypt(self, ct, sk):
+
+        return self.decryptCompressed(self.compress(self.array(ct)[..., 0:self.ell, :, :]), sk)
+
+
+    def decryptCompressed(self, mat, sk):
+
+        return self.roundPhases(self.phases(mat, sk))
+
+
+    def phases(self, mats, sk):
+
+        if isinstance(mats, (list, tuple)):
+            mats = np.stack([unwrap(mat) for mat in mats])
+
+        rows = self.array(mats)[..., 0:self.ell, :, :]
+
+        if self.ntt is not None:
+            prod = self.evalMult(self.ntt.forward(rows[..., 1:2, :]), self.secretEval(sk))
+        else:
+            prod = self.matrixMult(rows[..., 1:2, :], unwrap(sk)[self.ell, 0][None, None, :])
+
+        return (rows[..., 0, :] + prod[..., 0, :]) % self.q
+
+
+    def roundPhases(self, v):
+
+        return self.gadget.round(v)
+
+
+    def gadgetMatrix(self, g):
+
+        return self.matrixFlatten(self.identity(g))
+
+
+    def scalarDigits(self, g):
+
+        build = lambda: self.gadget.decompose(np.array([(g << int(s)) % self.q for s in self.gadget.shifts], dtype=self.dtype)[:, None])
+
+        return self.paramset.scalarGadget(('numpy', self.gadget.base_log, g), lambda: build().reshape(self.ell, self.ell))
+
+
+    def scalarMult(self, ct, digits):
+
+        ct = self.array(ct)
+        *lead, nr, nc, n = ct.shape
+
+        blocks = ct.reshape(*lead, nr // self.ell, self.ell, nc * n)
+        prod = (digits @ blocks) % self.q
+
+        return prod.reshape(*prod.shape[:-3], nr, nc, n)
+
+
+    def compress(self, ct):
+
+        return RingArray(self.matrixBitDecompInv(ct), self.q, self.n)
+
+
+    def expand(self, mat):
+
+        return self.ciphertext(self.matrixBitDecomp(mat))
+
+
+    def compressedAdd(self, mat1, mat2):
+
+        return RingArray(unwrap(mat1), self.q, self.n) + mat2
+
+
+    def compressedMultConst(self, mat, g):
+
+        key = scalarKey(g, self.q)
+
+        if key is None:
+            return RingArray(self.matrixMult(self.gadgetMatrix(g), mat), self.q, self.n)
+
+        return RingArray(self.scalarMult(mat, self.scalarDigits(key)), self.q, self.n)
+
+
+    def homMultConst(self, ct, g):
+
+        gct = self.compressedMultConst(self.compress(ct), g)
+
+        return self.expand(gct)
+
+
+    def homAdd(self, ct1, ct2):
+
+        return self.matrixFlatten((self.array(ct1) + self.array(ct2)) % self.q)
+
+
+    def encryptBatch(self, pts, pk):
+
+        return self.encrypt(self.polys(pts), pk)
+
+
+    def decryptBatch(self, cts, sk):
+
+        return self.decrypt(cts, sk)
+
+
+    def decryptBatchCompressed(self, mats, sk):
+
+        return self.decryptCompressed(mats, sk)
+
+
+    def decryptMultConstBatch(self, ct, gs, sk):
+
+        keys = [scalarKey(g, self.q) for g in gs]
+
+        if None in keys:
+            mat = self.compress(ct)
+            return self.decryptCompressed(np.stack([self.compressedMultConst(mat, g) for g in gs]), sk)
+
+        digits = np.stack([self.scalarDigits(key) for key in keys])
+        v = self.phases(self.matrixBitDecompInv(self.array(ct)[..., 0:self.ell, :, :]), sk)
+
+        return self.roundPhases((digits @ v) % self.q)
+
+
+    def homMultConstBatch(self, cts, gs):
+
+        keys = [scalarKey(g, self.q) for g in gs] if not isinstance(gs, np.ndarray) or gs.ndim == 1 else [None]
+
+        if keys and None not in keys:
+            digits = np.stack([self.scalarDigits(key) for key in keys])[:, None]
+            return self.expand(self.scalarMult(self.compress(cts), digits))
+
+        consts, index = np.unique(self.polys(gs), axis=0, return_inverse=True)
+        gct = self.matrixFlatten(self.identity(consts))
+
+        if self.ntt is not None:
+            gct = self.evalMult(self.ntt.forward(gct)[index.ravel()], self.toEval(cts))
+        else:
+            gct = self.matrixMult(gct[index.ravel()], cts)
+
+        return self.matrixFlatten(gct)
+
+
+    def homAddBatch(self, cts1, cts2):
+
+        return self.homAdd(cts1, cts2)
@@ -0,0 +1,82 @@
+from Crypto.Cipher import AES
+from threading import Lock
+from os import urandom
+from math import ceil
+import numpy as np
+
+
+SEED_SIZE = 32
+TAIL_CUT = 10
+CDT_BITS = 63
+
+
+def cdtTable(sigma, tail=TAIL_CUT):
+
+    bound = int(ceil(tail * sigma))
+    support = np.arange(-bound, bound + 1, dtype=np.float64)
+
+    weights = np.exp(-support**2 / (2 * sigma**2))
+    cdf = np.cumsum(weights) / weights.sum()
+
+    table = (cdf * float(1 << CDT_BITS)).astype(np.uint64)
+    table[-1] = 1 << CDT_BITS
+
+    return table
+
+
+class Sampler:
+
+
+    def __init__(self, q, cdt, seed=None):
+
+        assert all([q > 1, q & (q - 1) == 0])
+
+        self.q = q
+        self.k = q.bit_length() - 1
+        self.cdt = cdt
+        self.bound = len(cdt) >> 1
+
+        self.seed = seed or urandom(SEED_SIZE)
+        self.stream = AES.new(self.seed, AES.MODE_CTR, nonce=b'')
+        self.lock = Lock()
+
+
+    def randomBytes(self, count):
+
+        with self.lock:
+            return self.stream.encrypt(bytes(count))
+
+
+    def words(self, count):
+
+        return np.frombuffer(self.randomBytes(count << 3), dtype='<u8')
+
+
+    def uniform(self, shape):
+
+        count = int(np.prod(shape))
+
+        if self.k <= 63:
+            return (self.words(count) & np.uint64(self.q - 1)).astype(np.int64).reshape(shape)
+
+        size = ceil(self.k / 8)
+        buf = self.randomBytes(count * size)
+        coeffs = [int.from_bytes(buf[i: i+size], 'little') % self.q for i in range(0, len(buf), size)]
+
+        return np.array(coeffs, dtype=object).reshape(shape)
+
+
+    def binary(self, shape):
+
+        count = int(np.prod(shape))
+        buf = np.frombuffer(self.randomBytes((count + 7) >> 3), dtype=np.uint8)
+
+        return np.unpackbits(buf, count=count).astype(np.int64).reshape(shape)
+
+
+    def gaussian(self, shape):
+
+        count = int(np.prod(shape))
+        index = np.searchsorted(self.cdt, self.words(count) >> np.uint64(1), side='right')
+
+        return (index.astype(np.int64) - self.bound).reshape(shape)
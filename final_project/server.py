@@ -1,89 +1,333 @@
-from sage.all import var, PolynomialRing, Zmod
-from utils import server_socket, send_data, recv_data
-import ot_1_N, ot_K_N
-from os import urandom
-import pickle
-
-
-def on_new_connect(client, msg_list):
-
-    q, n, sigma = 2**17, 2**4, 5
-    var('x')
-    
-    ring = PolynomialRing(Zmod(q), 'x').quotient(x**n + 1, 'x')
-    send_data(client, pickle.dumps(ring))
-
-    ot_sender = ot_1_N.OTSender(ring, msg_list, sigma)
-    send_data(client, pickle.dumps(ot_sender.pk))
-    send_data(client, pickle.dumps(len(msg_list)))
-    
-    scheme = pickle.loads(recv_data(client))
-    if scheme == 'K_OUT_OF_N':
-
-        sk, pk = ot_sender.sk, ot_sender.pk
-        ot_sender = ot_K_N.OTSender(ring, msg_list, sigma)
-        ot_sender.sk = sk
-        ot_sender.pk = pk
-
-    return ot_sender
-
-
-def ot_1_out_of_N(client, ot_sender):
-
-    print('\nsending a random encryption (A)\n')
-    A = ot_sender.random_encryption()
-    send_data(client, pickle.dumps(A))
-
-    B = pickle.loads(recv_data(client))
-    print('recieved homomorphic encryption of A (B)\n')
-
-    print('sending symmetric AES ciphertexts\n')
-    ct_list = ot_sender.generate_ciphertexts(B)
-    send_data(client, pickle.dumps(ct_list))
-
-
-def ot_K_out_of_N(client, ot_sender):
-
-    print('sending a random encryption (A, T_A)\n')
-    A, T_A = ot_sender.random_encryption()
-    send_data(client, pickle.dumps((A, T_A)))
-
-    U, T_B = pickle.loads(recv_data(client))
-    print('received homomorphic encryptions of A (U, T_B)\n')
-
-    print('sending dummy secret key\n')
-    send_data(client, pickle.dumps(ot_sender.fake_sk))
-
-    print('sending symmetric AES ciphertexts\n')
-    ct_list, V = ot_sender.generate_ciphertexts(U, T_B)
-    send_data(client, pickle.dumps((ct_list, V)))
-
-
-def main(host, port):
-
-    server_sock = server_socket(host, port)
-    print(f'\n[*] listening on port {port}\n')
-
-    client, _ = server_sock.accept()
-    print('connection accepted\n')
-    msg_list = [urandom(16) for _ in range(6)]
-
-    print('messages (visible to sender):\n')
-    for i in range(len(msg_list)):
-        print(f'{i}. {msg_list[i].hex()}')
-
-    print('\nsharing parameters\n')
-    ot_sender = on_new_connect(client, msg_list)
-
-    if ot_sender.scheme == '1_OUT_OF_N':
-        ot_1_out_of_N(client, ot_sender)
-    elif ot_sender.scheme == 'K_OUT_OF_N':
-        ot_K_out_of_N(client, ot_sender)
-
-    server_sock.close()
-    print('[*] connection closed\n')
-
-
-if __name__ == '__main__':
-
-    main('localhost', 3000)
+from utils import server_socket, send_data, recv_data, polynomial_ring, MeteredSocket
+from utils import async_send_data, async_recv_data
+from concurrent.futures import ProcessPoolExecutor
+from codec import Params, encode, decode
+from keypool import KeyPool
+from stream import send_stream, async_send_stream
+from pipeline import pipelined_sender, fork_sender
+from store import MessageStore
+from ot_1_N import KEY_CHUNK
+import ot_1_N, ot_K_N
+from os import urandom
+import asyncio
+import sys
+
+
+BACKEND = 'numpy'
+BASE_LOG = 1
+SEEDED_KEYS = True
+PREVIEW = 6
+WORKER_MSG_LIST = None
+
+
+def on_new_connect(client, msg_list, pool):
+
+    ring, sigma = pool.ring, pool.sigma
+    q, n = ring.base().modulus(), ring.modulus().degree()
+    send_data(client, encode(Params(q, n, sigma, BASE_LOG)))
+
+    material = pool.get()
+    ot_sender = ot_1_N.OTSender(ring, msg_list, sigma, BACKEND, material=material, base_log=BASE_LOG)
+    send_data(client, encode(ot_sender.cpk if SEEDED_KEYS else ot_sender.pk))
+    send_data(client, encode(len(msg_list)))
+    
+    scheme, mode, count = parse_request(decode(recv_data(client)))
+    if scheme == 'K_OUT_OF_N':
+        ot_sender = ot_K_N.OTSender(ring, msg_list, sigma, BACKEND, material=material, base_log=BASE_LOG)
+
+    return ot_sender, mode, count
+
+
+def parse_request(request):
+
+    request = [request] if isinstance(request, str) else list(request)
+    scheme, mode, count = request + ['BUFFERED', 1][len(request)-1:]
+
+    assert scheme in ['1_OUT_OF_N', 'K_OUT_OF_N']
+    assert mode in ['BUFFERED', 'STREAM', 'PIPELINE']
+    assert mode != 'PIPELINE' or scheme == '1_OUT_OF_N', "only 1-out-of-N transfers are pipelined"
+    assert isinstance(count, int) and count > 0
+
+    return scheme, mode, count
+
+
+def ot_1_out_of_N(client, ot_sender, stream=False):
+
+    print('\nsending a random encryption (A)\n')
+    A = ot_sender.random_encryption()
+    send_data(client, encode(A))
+
+    B = decode(recv_data(client))
+    print('recieved homomorphic encryption of A (B)\n')
+
+    if stream:
+        print('streaming symmetric AES-GCM ciphertexts\n')
+        for key, msg in zip(ot_sender.iter_keys(B), ot_sender.msg_list):
+            send_stream(client, key, msg)
+        return
+
+    print('sending symmetric AES ciphertexts\n')
+    ct_list = list(ot_sender.generate_ciphertexts(B))
+    send_data(client, encode(ct_list))
+
+
+def ot_K_out_of_N(client, ot_sender, stream=False):
+
+    print('sending a random encryption (A, T_A)\n')
+    A, T_A = ot_sender.random_encryption()
+    send_data(client, encode((A, T_A)))
+
+    U, T_B = decode(recv_data(client))
+    print('received homomorphic encryptions of A (U, T_B)\n')
+
+    print('sending dummy secret key\n')
+    send_data(client, encode(ot_sender.fake_sk))
+
+    if stream:
+        print('streaming symmetric AES-GCM ciphertexts\n')
+        keys, V = ot_sender.lazy_keys(U, T_B)
+        send_data(client, encode(V))
+        for key, msg in zip(keys, ot_sender.msg_list):
+            send_stream(client, key, msg)
+        return
+
+    print('sending symmetric AES ciphertexts\n')
+    ct_list, V = ot_sender.generate_ciphertexts(U, T_B)
+    send_data(client, encode((list(ct_list), V)))
+
+
+def ot_1_out_of_N_pipelined(client, ot_sender, count, window=4):
+
+    print(f'\npipelining {count} transfers (up to {window} in flight)\n')
+    pipelined_sender(client, ot_sender, count, window)
+
+
+def load_messages(store=None):
+
+    msg_list = [urandom(16) for _ in range(6)] if store is None else MessageStore(store)
+
+    print('messages (visible to sender):\n')
+    for i in range(min(len(msg_list), PREVIEW)):
+        print(f'{i}. {msg_list[i].hex()}')
+    if len(msg_list) > PREVIEW:
+        print(f'... ({len(msg_list)} records)')
+
+    return msg_list
+
+
+def main(host, port, pool_size=2, store=None):
+
+    q, n, sigma = 2**17, 2**4, 5
+
+    ring = polynomial_ring(q, n)
+    pool = KeyPool(ring, sigma, BACKEND, size=pool_size, base_log=BASE_LOG).start()
+
+    server_sock = server_socket(host, port)
+    print(f'\n[*] listening on port {port}\n')
+
+    client, _ = server_sock.accept()
+    client = MeteredSocket(client)
+    print('connection accepted\n')
+    msg_list = load_messages(store)
+
+    print('\nsharing parameters\n')
+    ot_sender, mode, count = on_new_connect(client, msg_list, pool)
+
+    if mode == 'PIPELINE':
+        ot_1_out_of_N_pipelined(client, ot_sender, count)
+    elif ot_sender.scheme == '1_OUT_OF_N':
+        ot_1_out_of_N(client, ot_sender, mode == 'STREAM')
+    elif ot_sender.scheme == 'K_OUT_OF_N':
+        ot_K_out_of_N(client, ot_sender, mode == 'STREAM')
+
+    print(f'wire: sent {client.sent} bytes, received {client.received} bytes\n')
+    server_sock.close()
+    pool.close()
+    print(f'[*] connection closed (key pool: {pool.stats()})\n')
+
+
+def init_worker(msg_list):
+
+    global WORKER_MSG_LIST
+    WORKER_MSG_LIST = msg_list
+
+
+def run_sender_step(ot_sender, step, *args):
+
+    ot_sender.msg_list = WORKER_MSG_LIST
+    result = getattr(ot_sender, step)(*args)
+    ot_sender.msg_list = None
+
+    return ot_sender, result
+
+
+async def offload(executor, ot_sender, step, *args):
+
+    loop = asyncio.get_running_loop()
+    msg_list, ot_sender.msg_list = ot_sender.msg_list, None
+
+    ot_sender, result = await loop.run_in_executor(executor, run_sender_step, ot_sender, step, *args)
+    ot_sender.msg_list = msg_list
+
+    return ot_sender, result
+
+
+async def serve_client(reader, writer, msg_list, pool, executor):
+
+    loop = asyncio.get_running_loop()
+    ring, sigma = pool.ring, pool.sigma
+    q, n = ring.base().modulus(), ring.modulus().degree()
+
+    await async_send_data(writer, encode(Params(q, n, sigma, BASE_LOG)))
+
+    material = await loop.run_in_executor(None, pool.get)
+    ot_sender = ot_1_N.OTSender(ring, msg_list, sigma, BACKEND, material=material, base_log=BASE_LOG)
+    await async_send_data(writer, encode(ot_sender.cpk if SEEDED_KEYS else ot_sender.pk))
+    await async_send_data(writer, encode(len(msg_list)))
+
+    scheme, mode, count = parse_request(decode(await async_recv_data(reader)))
+
+    if mode == 'PIPELINE':
+        await serve_pipelined(reader, writer, ot_sender, count, executor)
+
+    elif scheme == '1_OUT_OF_N':
+        A = ot_sender.random_encryption()
+        await async_send_data(writer, encode(A))
+
+        B = decode(await async_recv_data(reader))
+
+        if mode == 'STREAM':
+            await stream_messages(writer, executor, ot_sender, B)
+        else:
+            ot_sender, keys = await offload(executor, ot_sender, 'generate_keys', B)
+            payload = await loop.run_in_executor(None, lambda: encode(list(ot_sender.encrypt_messages(keys))))
+            await async_send_data(writer, payload)
+
+    elif scheme == 'K_OUT_OF_N':
+        ot_sender = ot_K_N.OTSender(ring, msg_list, sigma, BACKEND, material=material, base_log=BASE_LOG)
+
+        ot_sender, (A, T_A) = await offload(executor, ot_sender, 'random_encryption')
+        await async_send_data(writer, encode((A, T_A)))
+
+        U, T_B = decode(await async_recv_data(reader))
+        await async_send_data(writer, encode(ot_sender.fake_sk))
+
+        if mode == 'STREAM':
+            ot_sender, V = await offload(executor, ot_sender, 'blind_encryptions', U)
+            await async_send_data(writer, encode(V))
+            await stream_messages(writer, executor, ot_sender, T_B)
+        else:
+            ot_sender, (keys, V) = await offload(executor, ot_sender, 'generate_keys', U, T_B)
+            payload = await loop.run_in_executor(None, lambda: encode((list(ot_sender.encrypt_messages(keys)), V)))
+            await async_send_data(writer, payload)
+
+
+async def stream_messages(writer, executor, ot_sender, *args, chunk=KEY_CHUNK):
+
+    messages = iter(ot_sender.msg_list)
+    t = ot_sender.t
+
+    derive = lambda start: asyncio.ensure_future(
+        offload(executor, ot_sender, 'key_range', *args, start, min(start + chunk, t)))
+    pending = derive(0)
+
+    try:
+        for start in range(0, t, chunk):
+            _, keys = await pending
+            pending = derive(start + chunk) if start + chunk < t else None
+
+            for key, msg in zip(keys, messages):
+                await async_send_stream(writer, key, msg)
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+async def serve_pipelined(reader, writer, ot_sender, count, executor, window=4):
+
+    loop = asyncio.get_running_loop()
+    template = fork_sender(ot_sender)
+    slots = asyncio.Semaphore(window)
+    pending = asyncio.Queue()
+
+    async def produce():
+        try:
+            for j in range(count):
+                await slots.acquire()
+                sender = ot_sender if j == 0 else fork_sender(template)
+                sender, A = await offload(executor, sender, 'random_encryption')
+                await pending.put(sender)
+                await async_send_data(writer, encode(['A', j, A]))
+        except Exception as e:
+            await pending.put(e)
+
+    producer = asyncio.create_task(produce())
+
+    try:
+        for j in range(count):
+            tag, i, B = decode(await async_recv_data(reader))
+            assert tag == 'B' and i == j, "out-of-order pipeline frame"
+
+            sender = await pending.get()
+            if isinstance(sender, Exception):
+                raise sender
+
+            sender, keys = await offload(executor, sender, 'generate_keys', B)
+            payload = await loop.run_in_executor(None, lambda: encode(['CT', j, list(sender.encrypt_messages(keys))]))
+            await async_send_data(writer, payload)
+            slots.release()
+
+        await producer
+    finally:
+        producer.cancel()
+
+
+async def on_client(reader, writer, msg_list, pool, executor, limit):
+
+    async with limit:
+        peer = writer.get_extra_info('peername')
+        try:
+            await serve_client(reader, writer, msg_list, pool, executor)
+            print(f'served {peer}')
+        except Exception as e:
+            print(f'client {peer} failed: {e}')
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+
+async def serve(host, port, msg_list, pool, executor, max_clients=16):
+
+    limit = asyncio.Semaphore(max_clients)
+    handler = lambda r, w: on_client(r, w, msg_list, pool, executor, limit)
+
+    server = await asyncio.start_server(handler, host, port, backlog=max_clients)
+    print(f'\n[*] serving on port {port} (up to {max_clients} concurrent clients)\n')
+
+    async with server:
+        await server.serve_forever()
+
+
+def serve_forever(host, port, workers=None, max_clients=16, pool_size=4, store=None):
+
+    q, n, sigma = 2**17, 2**4, 5
+
+    ring = polynomial_ring(q, n)
+    pool = KeyPool(ring, sigma, BACKEND, size=pool_size, base_log=BASE_LOG)
+    msg_list = load_messages(store)
+
+    try:
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(msg_list,)) as executor:
+            executor.submit(int).result()
+            pool.start()
+            asyncio.run(serve(host, port, msg_list, pool, executor, max_clients))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.close()
+        print(f'\n[*] server stopped (key pool: {pool.stats()})\n')
+
+
+if __name__ == '__main__':
+
+    serve_forever('localhost', 3000, store=sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,99 @@
+from array import array
+from mmap import mmap, ACCESS_READ
+from sys import byteorder
+import numpy as np
+import struct
+
+
+MAGIC = b'OTMS'
+VERSION = 1
+FOOTER = struct.Struct('<4sIQ')
+
+
+def write_store(path, messages):
+
+    offsets = array('Q', [0])
+
+    with open(path, 'wb') as f:
+        for msg in messages:
+            f.write(msg)
+            offsets.append(offsets[-1] + len(msg))
+
+        if byteorder != 'little':
+            offsets.byteswap()
+
+        f.write(offsets.tobytes())
+        f.write(FOOTER.pack(MAGIC, VERSION, len(offsets) - 1))
+
+    return len(offsets) - 1
+
+
+class MessageStore:
+
+
+    def __init__(self, path):
+
+        self.path = path
+
+        with open(path, 'rb') as f:
+            self.mm = mmap(f.fileno(), 0, access=ACCESS_READ)
+
+        magic, version, count = FOOTER.unpack_from(self.mm, len(self.mm) - FOOTER.size)
+        assert magic == MAGIC, "not a message store"
+        assert version == VERSION, f"unsupported store version {version}"
+
+        self.count = count
+        self.base = len(self.mm) - FOOTER.size - (count + 1) * 8
+        self.index = np.frombuffer(self.mm, dtype='<u8', count=count+1, offset=self.base)
+        self.view = memoryview(self.mm)
+
+        assert int(self.index[-1]) == self.base, "corrupt message store index"
+
+
+    def __len__(self):
+
+        return self.count
+
+
+    def __getitem__(self, i):
+
+        i = range(self.count)[i]
+
+        return self.view[int(self.index[i]): int(self.index[i+1])]
+
+
+    def __iter__(self):
+
+        for i in range(self.count):
+            yield self[i]
+
+
+    def size(self, i):
+
+        return int(self.index[i+1] - self.index[i])
+
+
+    def __reduce__(self):
+
+        return (MessageStore, (self.path,))
+
+
+    def close(self):
+
+        self.index = None
+        self.view.release()
+
+        try:
+            self.mm.close()
+        except BufferError:
+            pass
+
+
+    def __enter__(self):
+
+        return self
+
+
+    def __exit__(self, *exc):
+
+        self.close()
@@ -0,0 +1,180 @@
+from Crypto.Cipher import AES
+from utils import send_data, recv_data, async_send_data
+from mmap import mmap
+from os import urandom
+from math import ceil
+import asyncio
+import struct
+
+
+CHUNK_SIZE = 1 << 16
+NONCE_SIZE = 12
+TAG_SIZE = 16
+PREFIX_SIZE = NONCE_SIZE - 5
+FRAME_OVERHEAD = 1 + TAG_SIZE
+
+BUFFERS = (bytes, bytearray, memoryview, mmap)
+
+
+def reader(src):
+
+    if not isinstance(src, BUFFERS):
+        return src.read
+
+    view = memoryview(src)
+    off = 0
+
+    def read(count):
+        nonlocal off
+        piece = view[off: off+count]
+        off += len(piece)
+        return piece
+
+    return read
+
+
+def read_chunks(src, chunk_size=CHUNK_SIZE):
+
+    read = reader(src)
+
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def stream_cipher(key, prefix, index, last):
+
+    assert index < 1 << 32, "too many chunks in one stream"
+
+    return AES.new(key, AES.MODE_GCM, nonce=prefix + struct.pack('>IB', index, last))
+
+
+def seal_chunk(key, prefix, index, chunk, last):
+
+    ct, tag = stream_cipher(key, prefix, index, last).encrypt_and_digest(chunk)
+
+    return bytes([last]) + ct + tag
+
+
+def open_chunk(key, prefix, index, frame):
+
+    if len(frame) < FRAME_OVERHEAD or frame[0] > 1:
+        raise ValueError('malformed stream chunk')
+
+    last = frame[0]
+    pt = stream_cipher(key, prefix, index, last).decrypt_and_verify(frame[1:-TAG_SIZE], frame[-TAG_SIZE:])
+
+    return pt, last
+
+
+def encrypt_chunks(key, src, chunk_size=CHUNK_SIZE):
+
+    prefix = urandom(PREFIX_SIZE)
+    yield prefix
+
+    chunks = read_chunks(src, chunk_size)
+    chunk = next(chunks, b'')
+    index = 0
+
+    while chunk is not None:
+        following = next(chunks, None)
+        yield seal_chunk(key, prefix, index, chunk, following is None)
+        chunk = following
+        index += 1
+
+
+def encrypted_size(size, chunk_size=CHUNK_SIZE):
+
+    return PREFIX_SIZE + size + max(ceil(size / chunk_size), 1) * FRAME_OVERHEAD
+
+
+def encrypt_stream(key, src, dst, chunk_size=CHUNK_SIZE):
+
+    written = 0
+
+    for piece in encrypt_chunks(key, src, chunk_size):
+        dst.write(piece)
+        written += len(piece)
+
+    return written
+
+
+def decrypt_stream(key, src, dst, size, chunk_size=CHUNK_SIZE):
+
+    read = reader(src)
+    prefix = bytes(read(PREFIX_SIZE))
+    remaining = size - len(prefix)
+    written = 0
+    last = False
+    index = 0
+
+    while not last:
+        frame = bytes(read(min(chunk_size + FRAME_OVERHEAD, remaining)))
+        pt, last = open_chunk(key, prefix, index, frame)
+        dst.write(pt)
+        written += len(pt)
+        remaining -= len(frame)
+        index += 1
+
+    if remaining != 0:
+        raise ValueError('trailing bytes after the final stream chunk')
+
+    return written
+
+
+def send_stream(c, key, src, chunk_size=CHUNK_SIZE):
+
+    sent = 0
+
+    for piece in encrypt_chunks(key, src, chunk_size):
+        send_data(c, piece)
+        sent += len(piece)
+
+    return sent
+
+
+async def async_send_stream(writer, key, src, chunk_size=CHUNK_SIZE):
+
+    loop = asyncio.get_running_loop()
+    pieces = encrypt_chunks(key, src, chunk_size)
+    sent = 0
+
+    piece = await loop.run_in_executor(None, next, pieces, None)
+
+    while piece is not None:
+        await async_send_data(writer, piece)
+        sent += len(piece)
+        piece = await loop.run_in_executor(None, next, pieces, None)
+
+    return sent
+
+
+def recv_stream(c, key, dst, max_chunk=CHUNK_SIZE):
+
+    prefix = recv_data(c, PREFIX_SIZE)
+    written = 0
+    last = False
+    index = 0
+
+    while not last:
+        pt, last = open_chunk(key, prefix, index, recv_data(c, max_chunk + FRAME_OVERHEAD))
+        dst.write(pt)
+        written += len(pt)
+        index += 1
+
+    return written
+
+
+def skip_stream(c, max_chunk=CHUNK_SIZE):
+
+    skipped = len(recv_data(c, PREFIX_SIZE))
+    last = False
+
+    while not last:
+        frame = recv_data(c, max_chunk + FRAME_OVERHEAD)
+        last = len(frame) > 0 and frame[0] == 1
+        skipped += len(frame)
+
+    return skipped
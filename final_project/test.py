@@ -1,182 +1,818 @@
-from sage.all import var, PolynomialRing, Zmod
-from math import floor, ceil, log2
-from random import randrange, sample
-from ringgsw import RingGSW
-import ot_1_N, ot_K_N
-
-
-class RingGSWOTTests:
-
-    
-    def __init__(self, q, n, sigma=5):
-
-        assert all([q > 1, floor(log2(q)) == ceil(log2(q))])
-        assert all([n > 1, floor(log2(n)) == ceil(log2(n))])
-        
-        self.k = ceil(log2(q))
-        self.sigma = sigma
-        
-        var('x')
-        self.Zq = Zmod(q)
-        F = PolynomialRing(self.Zq, 'x')
-        self.Rq = F.quotient(x**n + 1, 'x')
-        
-        self.rgsw = RingGSW(self.Rq, self.sigma)
-        self.sk, self.pk = self.rgsw.keygen()
-
-        
-    def dotProduct(self, v1, v2):
-        
-        assert len(v1) == len(v2)
-        
-        prod = self.Rq(0)
-        for u, v in zip(v1, v2):
-            prod += u * v
-        
-        return prod
-
-    
-    def propertiesTest(self):
-
-        a = self.Rq.random_element()
-        b = self.Rq.random_element()
-        v = [self.Rq.random_element() for _ in range(self.k)]
-
-        try:
-            assert self.rgsw.bitDecompInv(self.rgsw.bitDecomp(a)) == a
-
-            w = self.rgsw.flatten(v)
-            t = self.rgsw.bitDecomp(a)
-            y = self.rgsw.powersOf2(b)
-            z = self.rgsw.bitDecompInv(v)
-
-            assert all([
-                self.dotProduct(t, y) == a * b,
-                self.dotProduct(v, y) == self.dotProduct(w, y) == z * b
-            ])
-
-            print("powersOf2, bitDecomp, bitDecompInv, flatten [OK]\n")
-
-        except Exception as e:
-            print("powersOf2, bitDecomp, bitDecompInv, flatten [Failed]")
-            print(f"\n{str(e)}\n")
-
-
-    def encryptDecryptTest(self):
-
-        m = self.Rq.random_element()
-        ct = self.rgsw.encrypt(m, self.pk)
-        z = self.rgsw.decrypt(ct, self.sk)
-
-        try:
-            assert z == m
-            print("encryption, decryption [OK]\n")
-
-        except AssertionError:
-            print("encryption, decryption [Failed]")
-            print(f"\nactual: {m}\n\nobtained: {z}\n")
-
-
-    def homMultConstTest(self, L=20):
-        
-        msg = self.Rq.random_element()
-        gct = self.rgsw.encrypt(msg, self.pk)
-        
-        i = 0
-        
-        try:
-            while i < L:
-
-                g = self.Zq.random_element()
-                if g == 0: continue
-                
-                gct = self.rgsw.homMultConst(msg, g)
-                msg *= self.Rq(g)
-
-                z = self.rgsw.decrypt(gct, self.sk)
-                assert z == msg
-                
-                i += 1
-            
-            print("homomorphic constant multiplication [OK]\n")
-        
-        except AssertionError:
-            print(f"homomorphic constant multiplication [Failed at op. {i+1}/{L}]")
-            print(f"\nactual: {msg}\n\nobtained: {z}\n")
-
-
-    def homAddTest(self, L=20):
-        
-        msg = self.Rq.random_element()
-        hct = self.rgsw.encrypt(msg, self.pk)
-        
-        i = 0
-        
-        try:
-            while i < L:
-
-                m = self.Rq.random_element()
-                ct = self.rgsw.encrypt(m, self.pk)
-
-                hct = self.rgsw.homAdd(hct, ct)
-                msg += m
-
-                z = self.rgsw.decrypt(hct, self.sk)
-                assert z == msg
-                
-                i += 1
-            
-            print("homomorphic addition [OK]\n")
-        
-        except AssertionError:
-            print(f"homomorphic addition [Failed at op. {i+1}/{L}]")
-            print(f"\nactual: {msg}\n\nobtained: {z}\n")
-            
-
-    def ot_1_out_of_N_Test(self, N=20):
-        
-        e = randrange(N)
-        messages = [bytes([randrange(256) for _ in range(10)]) for _ in range(N)]
-
-        try:
-            assert ot_1_N.obliviousTransfer(self.Rq, messages, e, self.sigma)
-            print("1 out of N oblivious transfer [OK]\n")
-
-        except Exception as e:
-            print(f"1 out of N oblivious transfer [Failed]")
-            print(f"\n{str(e)}\n")
-
-
-    def ot_K_out_of_N_Test(self, N=20):
-
-        e = sample(range(N), randrange(2, N))
-        messages = [bytes([randrange(256) for _ in range(10)]) for _ in range(N)]
-
-        try:
-            assert ot_K_N.obliviousTransfer(self.Rq, messages, e, self.sigma)
-            print("K out of N oblivious transfer [OK]\n")
-
-        except Exception as e:
-            print(f"K out of N oblivious transfer [Failed]")
-            print(f"\n{str(e)}\n")
-
-
-    def runAllTests(self):
-
-        self.propertiesTest()
-        self.encryptDecryptTest()
-        self.homMultConstTest()
-        self.homAddTest()
-        self.ot_1_out_of_N_Test()
-        self.ot_K_out_of_N_Test()
-
-
-def main():
-
-    test = RingGSWOTTests(q=2**17, n=2**4, sigma=5)
-    test.runAllTests()
-
-
-if __name__ == '__main__':
-
-    main()
+from sage.all import var, PolynomialRing, Zmod, ZZ
+from math import floor, ceil, log2
+from random import randrange, sample
+from ringgsw import RingGSW
+from keypool import KeyPool
+from concurrent.futures import ProcessPoolExecutor
+from utils import polynomialHash, polynomialHashes, send_data, recv_data
+from Crypto.Util.number import long_to_bytes
+from hashlib import sha256
+from threading import Thread
+from os import urandom
+import socket
+import struct
+from codec import Params, encode, decode, MAGIC, VERSION, T_BYTES, T_LIST, T_TYPED
+import ot_1_N, ot_K_N
+import instrument
+import pipeline
+import stream
+import pickle
+from ciphertext import Ciphertext, PublicKey, SecretKey
+from paramset import parameterSet
+from sampler import Sampler, cdtTable
+from store import MessageStore, write_store
+import io
+import os
+import tempfile
+
+
+class RingGSWOTTests:
+
+    
+    def __init__(self, q, n, sigma=5):
+
+        assert all([q > 1, floor(log2(q)) == ceil(log2(q))])
+        assert all([n > 1, floor(log2(n)) == ceil(log2(n))])
+        
+        self.k = ceil(log2(q))
+        self.sigma = sigma
+        
+        var('x')
+        self.Zq = Zmod(q)
+        F = PolynomialRing(self.Zq, 'x')
+        self.Rq = F.quotient(x**n + 1, 'x')
+        
+        self.rgsw = RingGSW(self.Rq, self.sigma)
+        self.sk, self.pk = self.rgsw.keygen()
+
+        
+    def dotProduct(self, v1, v2):
+        
+        assert len(v1) == len(v2)
+        
+        prod = self.Rq(0)
+        for u, v in zip(v1, v2):
+            prod += u * v
+        
+        return prod
+
+    
+    def propertiesTest(self):
+
+        a = self.Rq.random_element()
+        b = self.Rq.random_element()
+        v = [self.Rq.random_element() for _ in range(self.k)]
+
+        try:
+            assert self.rgsw.bitDecompInv(self.rgsw.bitDecomp(a)) == a
+
+            w = self.rgsw.flatten(v)
+            t = self.rgsw.bitDecomp(a)
+            y = self.rgsw.powersOf2(b)
+            z = self.rgsw.bitDecompInv(v)
+
+            assert all([
+                self.dotProduct(t, y) == a * b,
+                self.dotProduct(v, y) == self.dotProduct(w, y) == z * b
+            ])
+
+            print("powersOf2, bitDecomp, bitDecompInv, flatten [OK]\n")
+
+        except Exception as e:
+            print("powersOf2, bitDecomp, bitDecompInv, flatten [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def encryptDecryptTest(self):
+
+        m = self.Rq.random_element()
+        ct = self.rgsw.encrypt(m, self.pk)
+        z = self.rgsw.decrypt(ct, self.sk)
+
+        try:
+            assert z == m
+            print("encryption, decryption [OK]\n")
+
+        except AssertionError:
+            print("encryption, decryption [Failed]")
+            print(f"\nactual: {m}\n\nobtained: {z}\n")
+
+
+    def homMultConstTest(self, L=20):
+        
+        msg = self.Rq.random_element()
+        gct = self.rgsw.encrypt(msg, self.pk)
+        
+        i = 0
+        
+        try:
+            while i < L:
+
+                g = self.Zq.random_element()
+                if g == 0: continue
+                
+                gct = self.rgsw.homMultConst(msg, g)
+                msg *= self.Rq(g)
+
+                z = self.rgsw.decrypt(gct, self.sk)
+                assert z == msg
+                
+                i += 1
+            
+            print("homomorphic constant multiplication [OK]\n")
+        
+        except AssertionError:
+            print(f"homomorphic constant multiplication [Failed at op. {i+1}/{L}]")
+            print(f"\nactual: {msg}\n\nobtained: {z}\n")
+
+
+    def homAddTest(self, L=20):
+        
+        msg = self.Rq.random_element()
+        hct = self.rgsw.encrypt(msg, self.pk)
+        
+        i = 0
+        
+        try:
+            while i < L:
+
+                m = self.Rq.random_element()
+                ct = self.rgsw.encrypt(m, self.pk)
+
+                hct = self.rgsw.homAdd(hct, ct)
+                msg += m
+
+                z = self.rgsw.decrypt(hct, self.sk)
+                assert z == msg
+                
+                i += 1
+            
+            print("homomorphic addition [OK]\n")
+        
+        except AssertionError:
+            print(f"homomorphic addition [Failed at op. {i+1}/{L}]")
+            print(f"\nactual: {msg}\n\nobtained: {z}\n")
+            
+
+    def numpyBackendTest(self):
+
+        nrgsw = RingGSW(self.Rq, self.sigma, backend='numpy')
+
+        a = self.Rq.random_element()
+        m = self.Rq.random_element()
+        g = self.Zq.random_element()
+        ct = self.rgsw.encrypt(m, self.pk)
+        nct, nsk = nrgsw.toArray(ct), nrgsw.toArray(self.sk)
+
+        try:
+            assert all([
+                nrgsw.toRing(nrgsw.bitDecomp(a)) == self.rgsw.bitDecomp(a),
+                nrgsw.toRing(nrgsw.powersOf2(a)) == self.rgsw.powersOf2(a),
+                nrgsw.toRing(nrgsw.matrixFlatten(nct)) == self.rgsw.matrixFlatten(ct),
+                nrgsw.toRing(nrgsw.matrixMult(nct, nsk)) == ct * self.sk,
+                nrgsw.toRing(nrgsw.homMultConst(nct, g)) == self.rgsw.homMultConst(ct, g),
+                nrgsw.toRing(nrgsw.homAdd(nct, nct)) == self.rgsw.homAdd(ct, ct),
+                nrgsw.toRing(nrgsw.decrypt(nct, nsk)) == self.rgsw.decrypt(ct, self.sk) == m
+            ])
+
+            nsk, npk = nrgsw.keygen()
+            nm = nrgsw.randomElement()
+            assert all(nrgsw.decrypt(nrgsw.encrypt(nm, npk), nsk) == nm)
+
+            print("numpy backend [OK]\n")
+
+        except Exception as e:
+            print("numpy backend [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def nttTest(self):
+
+        nrgsw = RingGSW(self.Rq, self.sigma, backend='numpy', mult='ntt')
+
+        m = self.Rq.random_element()
+        ct = self.rgsw.encrypt(m, self.pk)
+        nct, nsk, npk = nrgsw.toArray(ct), nrgsw.toArray(self.sk), nrgsw.toArray(self.pk)
+
+        try:
+            assert all([
+                nrgsw.toRing(nrgsw.matrixMult(nct, nsk)) == ct * self.sk,
+                nrgsw.toRing(nrgsw.matrixMult(nct, nct)) == ct * ct,
+                nrgsw.toRing(nrgsw.decrypt(nrgsw.encrypt(m, npk), nsk)) == m
+            ])
+
+            print("NTT ring multiplication [OK]\n")
+
+        except Exception as e:
+            print("NTT ring multiplication [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def gadgetTest(self, bases=range(2, 10)):
+
+        accepted = []
+
+        try:
+            for base_log in bases:
+                try:
+                    nrgsw = RingGSW(self.Rq, self.sigma, backend='numpy', base_log=base_log)
+                except AssertionError:
+                    continue
+
+                accepted.append(base_log)
+                sk, pk = nrgsw.keygen()
+
+                a = nrgsw.randomElement()
+                b = nrgsw.randomElement()
+
+                t = nrgsw.bitDecomp(a)[:, None, :]
+                y = nrgsw.powersOf2(b)[None, :, :]
+
+                assert all(nrgsw.bitDecompInv(nrgsw.bitDecomp(a)) == a)
+                assert all(nrgsw.matrixMult(y, t)[0, 0] == nrgsw.polyMult(a, b))
+
+                ct = nrgsw.encrypt(a, pk)
+                assert all(nrgsw.decrypt(ct, sk) == a)
+
+                for _ in range(8):
+                    g = int(self.Zq.random_element())
+                    assert all(nrgsw.decrypt(nrgsw.homMultConst(ct, g), sk) == a * g % nrgsw.q)
+
+                assert ot_1_N.obliviousTransfer(self.Rq, [urandom(16) for _ in range(4)], 1, self.sigma, 'numpy', base_log=base_log)
+
+            assert accepted == list(bases)[:len(accepted)]
+            assert len(accepted) < len(bases)
+
+            print(f"gadget decomposition, bases 2^{accepted[0]} to 2^{accepted[-1]} [OK]\n")
+
+        except Exception as e:
+            print("gadget decomposition [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def keyPoolTest(self, N=20):
+
+        e = randrange(N)
+        messages = [bytes([randrange(256) for _ in range(10)]) for _ in range(N)]
+        pool = KeyPool(self.Rq, self.sigma, size=2, reuse=2)
+
+        try:
+            material = pool.get()
+            assert pool.stats()['misses'] == 1
+
+            sender = ot_1_N.OTSender(self.Rq, messages, self.sigma, material=material)
+            client = ot_1_N.OTReceiver(self.Rq, sender.pk, e, sender.t)
+
+            A = sender.random_encryption()
+            assert A is material.A
+
+            B = client.homomorphic_encryption(A)
+            assert client.decrypt(sender.generate_ciphertexts(B)) == messages[e]
+
+            print("key material pool [OK]\n")
+
+        except Exception as e:
+            print("key material pool [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def ot_1_out_of_N_Test(self, N=20):
+        
+        e = randrange(N)
+        messages = [bytes([randrange(256) for _ in range(10)]) for _ in range(N)]
+
+        try:
+            assert ot_1_N.obliviousTransfer(self.Rq, messages, e, self.sigma)
+            print("1 out of N oblivious transfer [OK]\n")
+
+        except Exception as e:
+            print(f"1 out of N oblivious transfer [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def ot_K_out_of_N_Test(self, N=20):
+
+        e = sample(range(N), randrange(2, N))
+        messages = [bytes([randrange(256) for _ in range(10)]) for _ in range(N)]
+
+        try:
+            assert ot_K_N.obliviousTransfer(self.Rq, messages, e, self.sigma)
+            print("K out of N oblivious transfer [OK]\n")
+
+        except Exception as e:
+            print(f"K out of N oblivious transfer [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def ot_batch_Test(self, N=20, T=8, backend='numpy'):
+
+        choices = [randrange(N) for _ in range(T)]
+        msg_lists = [[bytes([randrange(256) for _ in range(10)]) for _ in range(N)] for _ in range(T)]
+
+        try:
+            assert ot_1_N.obliviousTransferBatch(self.Rq, msg_lists, choices, self.sigma, backend)
+            print("batched 1 out of N oblivious transfer [OK]\n")
+
+        except Exception as e:
+            print(f"batched 1 out of N oblivious transfer [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def ot_packed_Test(self, N=20):
+
+        block = ot_1_N.packingBlock(self.rgsw)
+        choices = [randrange(N) for _ in range(self.rgsw.n // block)]
+        messages = [bytes([randrange(256) for _ in range(10)]) for _ in range(N)]
+
+        try:
+            assert ot_1_N.obliviousTransferPacked(self.Rq, messages, choices, self.sigma)
+            print(f"slot-packed 1 out of N oblivious transfer, {len(choices)} slots [OK]\n")
+
+        except Exception as e:
+            print(f"slot-packed 1 out of N oblivious transfer [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def parallelKeysTest(self, N=12, workers=3):
+
+        fake_sk, _ = self.rgsw.keygen()
+        ct = self.rgsw.encrypt(self.Rq.random_element(), self.pk)
+        consts = [int(self.Zq.random_element()) for _ in range(N)]
+
+        keys = [polynomialHash(self.rgsw.decrypt(self.rgsw.homMultConst(ct, g), fake_sk)) for g in consts]
+
+        try:
+            with ProcessPoolExecutor(workers) as executor:
+                jobs = [executor.submit(ot_K_N.derive_keys, self.rgsw, ct, fake_sk, chunk)
+                        for chunk in ot_K_N.split(consts, workers)]
+                assert keys == [key for job in jobs for key in job.result()]
+
+            print("parallel key derivation [OK]\n")
+
+        except Exception as e:
+            print("parallel key derivation [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def codecTest(self):
+
+        nrgsw = RingGSW(self.Rq, self.sigma, backend='numpy')
+        sk, pk = nrgsw.keygen()
+        ct = nrgsw.encrypt(nrgsw.randomElement(), pk)
+
+        try:
+            params = decode(encode(Params(nrgsw.q, nrgsw.n, self.sigma, 2)))
+            assert params == (nrgsw.q, nrgsw.n, self.sigma, 2)
+
+            assert (decode(encode(pk)) == pk).all()
+            assert len(encode(pk)) - len(encode(pk[:, :0])) == 2 * nrgsw.n * nrgsw.k // 8
+
+            ct_list, V = decode(encode(([b'\x00' * 32, b'\x01'], [ct, ct])))
+            assert ct_list == [b'\x00' * 32, b'\x01']
+            assert all([(V_i == ct).all() for V_i in V])
+
+            frame = encode(pk.data[0])
+            forged = frame[:7] + struct.pack('<2I', 1 << 20, 1 << 20) + frame[15:]
+
+            head = MAGIC + bytes([VERSION])
+            typed = lambda kind, n, body: head + struct.pack('<BBQI', T_TYPED, kind, nrgsw.q, n) + body[5:]
+            malformed = [
+                forged,
+                encode(5)[:-3],
+                encode([1, 2])[:8],
+                encode(params)[:-2],
+                encode(pk)[:9],
+                head + struct.pack('<BI', T_LIST, 1 << 20),
+                head + struct.pack('<BI', T_BYTES, 100) + b'abc',
+                typed(9, nrgsw.n, encode(ct.data)),
+                typed(0, nrgsw.n, encode(5)),
+                typed(0, nrgsw.n + 1, encode(ct.data)),
+            ]
+
+            for frame in malformed:
+                try:
+                    decode(frame)
+                    assert False, f"malformed frame {frame[:16].hex()} was accepted"
+                except ValueError:
+                    pass
+
+            print("binary ciphertext codec [OK]\n")
+
+        except Exception as e:
+            print("binary ciphertext codec [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def framingTest(self, size=1<<22):
+
+        s1, s2 = socket.socketpair()
+        frames = [urandom(size), b'', urandom(1 << 12)]
+        sender = Thread(target=lambda: [send_data(s1, f) for f in frames])
+
+        try:
+            sender.start()
+            assert all([recv_data(s2) == f for f in frames])
+            sender.join()
+
+            print("length-prefixed framing [OK]\n")
+
+        except Exception as e:
+            print("length-prefixed framing [Failed]")
+            print(f"\n{str(e)}\n")
+
+        s1.close()
+        s2.close()
+
+
+    def instrumentationTest(self, N=8):
+
+        messages = [urandom(16) for _ in range(N)]
+        sink = instrument.CounterSink()
+        encrypt = RingGSW.encrypt
+
+        try:
+            with instrument.instrumented(sink):
+                assert ot_1_N.obliviousTransfer(self.Rq, messages, randrange(N), self.sigma)
+
+            totals = sink.snapshot()
+            assert totals['rgsw.encrypt']['calls'] == 2
+            assert totals['aes.encrypt']['calls'] == N
+            assert totals['hash.polynomialHashes']['calls'] == 1
+            assert totals['ot_1_N.homomorphic_encryption']['wall'] > 0
+            assert totals['ot_1_N.encrypt_messages']['calls'] == 1 and totals['ot_1_N.iter_keys']['calls'] == 1
+            assert totals['ot_1_N.encrypt_messages']['wall'] >= totals['ot_1_N.iter_keys']['wall'] > 0
+            assert RingGSW.encrypt is encrypt and not instrument.sinks
+
+            nrgsw = RingGSW(self.Rq, self.sigma, 'numpy')
+            _, pk = nrgsw.keygen()
+            ct = nrgsw.encrypt(nrgsw.randomElements(3), pk)
+            gct = nrgsw.gadgetMatrix(5)
+
+            sink = instrument.CounterSink()
+            with instrument.instrumented(sink):
+                nrgsw.matrixMult(gct, ct)
+                nrgsw.homMultConst(ct, 5)
+
+            totals = sink.snapshot()
+            assert totals['rgsw.matrixMult']['ring_products'] == 3 * nrgsw.N**3
+            assert totals['rgsw.scalarMult']['scalar_products'] == 3 * nrgsw.N * nrgsw.ell * 2
+
+            print("instrumentation hooks [OK]\n")
+
+        except Exception as e:
+            print("instrumentation hooks [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def polynomialHashTest(self, L=20):
+
+        R = PolynomialRing(ZZ, 'x')
+        pols = [self.Rq.random_element() for _ in range(L)]
+        expected = [sha256(long_to_bytes(R([int(c) for c in pol]).subs(x=2))).digest() for pol in pols]
+
+        nrgsw = RingGSW(self.Rq, self.sigma, 'numpy')
+        arrays = nrgsw.polys(pols)
+
+        try:
+            assert [polynomialHash(pol) for pol in pols] == expected
+            assert polynomialHashes(pols) == expected
+            assert polynomialHashes(arrays) == expected
+            assert polynomialHashes(arrays.astype(object)) == expected
+
+            print("array polynomial hash [OK]\n")
+
+        except Exception as e:
+            print("array polynomial hash [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def streamTest(self, N=4, size=1<<18):
+
+        e = randrange(N)
+        messages = [urandom(size) for _ in range(N)]
+        s1, s2 = socket.socketpair()
+
+        try:
+            sender = ot_1_N.OTSender(self.Rq, messages, self.sigma)
+            client = ot_1_N.OTReceiver(self.Rq, sender.pk, e, sender.t)
+
+            keys = sender.generate_keys(client.homomorphic_encryption(sender.random_encryption()))
+            worker = Thread(target=lambda: [stream.send_stream(s1, keys[i], messages[i]) for i in range(N)])
+            worker.start()
+
+            out = io.BytesIO()
+            for i in range(N):
+                if i == e:
+                    assert stream.recv_stream(s2, client.selected_key(), out) == size
+                else:
+                    assert stream.skip_stream(s2) == stream.encrypted_size(size)
+            worker.join()
+
+            assert out.getvalue() == messages[e]
+
+            sealed = io.BytesIO()
+            assert stream.encrypt_stream(keys[e], messages[e], sealed) == stream.encrypted_size(size)
+
+            forged = bytearray(sealed.getvalue())
+            forged[-stream.CHUNK_SIZE] ^= 1
+            out = io.BytesIO()
+
+            try:
+                stream.decrypt_stream(keys[e], bytes(forged), out, len(forged))
+                assert False, "tampered stream was accepted"
+            except ValueError:
+                assert messages[e].startswith(out.getvalue()) and len(out.getvalue()) < size
+
+            print("streaming symmetric layer [OK]\n")
+
+        except Exception as e:
+            print("streaming symmetric layer [Failed]")
+            print(f"\n{str(e)}\n")
+
+        s1.close()
+        s2.close()
+
+
+    def ciphertextTypesTest(self):
+
+        nrgsw = RingGSW(self.Rq, self.sigma, 'numpy')
+        sk, pk = nrgsw.keygen()
+        m1, m2 = nrgsw.randomElement(), nrgsw.randomElement()
+        ct1, ct2 = nrgsw.encrypt(m1, pk), nrgsw.encrypt(m2, pk)
+
+        try:
+            assert all([isinstance(sk, SecretKey), isinstance(pk, PublicKey), isinstance(ct1, Ciphertext)])
+            assert ct1.data.flags['C_CONTIGUOUS'] and ct1.q == nrgsw.q and ct1.n == nrgsw.n
+            assert ct1.nbytes == nrgsw.N * nrgsw.N * nrgsw.n
+
+            results = [nrgsw.homAdd(ct1, ct2), nrgsw.homMultConst(ct1, 3), nrgsw.matrixFlatten(ct1), decode(encode(ct1))]
+            assert all([type(ct) is Ciphertext and ct.nbytes == ct1.nbytes for ct in results])
+
+            for ct in [pickle.loads(pickle.dumps(ct1)), decode(encode(ct1))]:
+                assert isinstance(ct, Ciphertext) and (ct == ct1).all()
+
+            acc = ct1.copy()
+            acc += ct2
+            assert (nrgsw.decrypt(nrgsw.matrixFlatten(acc), sk) == (m1 + m2) % nrgsw.q).all()
+            assert (nrgsw.decrypt(nrgsw.homMultConst(ct1, 3), sk) == 3 * m1 % nrgsw.q).all()
+
+            print("compact ciphertext and key types [OK]\n")
+
+        except Exception as e:
+            print("compact ciphertext and key types [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def parameterSetTest(self):
+
+        rgsw1 = RingGSW(self.Rq, self.sigma)
+        rgsw2 = RingGSW(self.Rq, self.sigma)
+        nrgsw = RingGSW(self.Rq, self.sigma, 'numpy')
+
+        sk, pk = rgsw1.keygen()
+        m = self.Rq.random_element()
+        ct = rgsw1.encrypt(m, pk)
+        g = self.Zq.random_element()
+
+        try:
+            assert rgsw1.paramset is rgsw2.paramset is nrgsw.paramset is parameterSet(rgsw1.q, rgsw1.n, self.sigma)
+            assert rgsw1.sampler.cdt is rgsw2.sampler.cdt and rgsw1.Zq is rgsw2.Zq
+
+            assert rgsw1.scalarDigits(int(g)) is rgsw2.scalarDigits(int(g))
+            assert nrgsw.scalarDigits(int(g)) is nrgsw.scalarDigits(int(g))
+            assert rgsw2.decrypt(rgsw2.homMultConst(ct, g), sk) == m * g
+
+            print("shared parameter sets [OK]\n")
+
+        except Exception as e:
+            print("shared parameter sets [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def scalarMultTest(self, L=5):
+
+        ct = self.rgsw.encrypt(self.Rq.random_element(), self.pk)
+
+        nrgsw = RingGSW(self.Rq, self.sigma, 'numpy')
+        nsk, npk = nrgsw.keygen()
+        nct = nrgsw.encrypt(nrgsw.randomElement(), npk)
+
+        try:
+            for _ in range(L):
+                g = self.Zq.random_element()
+                assert self.rgsw.homMultConst(ct, g) == self.rgsw.matrixFlatten(self.rgsw.gadgetMatrix(g) * ct)
+                assert (nrgsw.homMultConst(nct, g) == nrgsw.matrixFlatten(nrgsw.matrixMult(nrgsw.gadgetMatrix(g), nct))).all()
+
+            print("scalar homMultConst fast path [OK]\n")
+
+        except Exception as e:
+            print("scalar homMultConst fast path [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def lazyExpressionTest(self, K=3):
+
+        A = self.rgsw.encrypt(self.Rq.random_element(), self.pk)
+        T_A = self.rgsw.encrypt(self.Rq.random_element(), self.pk)
+        consts = [self.Zq.random_element() for _ in range(K + 1)]
+
+        try:
+            lazy_A, lazy_T_A = self.rgsw.lazy(A), self.rgsw.lazy(T_A)
+
+            for e in consts[:K]:
+                eager = self.rgsw.homMultConst(self.rgsw.homAdd(T_A, self.rgsw.homMultConst(A, e)), consts[K])
+                fused = (lazy_T_A + lazy_A.multConst(e)).multConst(consts[K]).evaluate()
+                assert eager == fused
+
+            print("fused lazy expressions [OK]\n")
+
+        except Exception as e:
+            print("fused lazy expressions [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def pipelineTest(self, N=6, T=5, window=2):
+
+        messages = [urandom(16) for _ in range(N)]
+        choices = [randrange(N) for _ in range(T)]
+        s1, s2 = socket.socketpair()
+
+        try:
+            sender = ot_1_N.OTSender(self.Rq, messages, self.sigma)
+            receivers = [ot_1_N.OTReceiver(self.Rq, sender.pk, e, N) for e in choices]
+
+            worker = Thread(target=pipeline.pipelined_sender, args=(s1, sender, T, window))
+            worker.start()
+
+            out = list(pipeline.pipelined_receiver(s2, receivers))
+            worker.join()
+
+            assert out == [messages[e] for e in choices]
+
+            print("pipelined transfers [OK]\n")
+
+        except Exception as e:
+            print("pipelined transfers [Failed]")
+            print(f"\n{str(e)}\n")
+
+        s1.close()
+        s2.close()
+
+
+    def samplerTest(self, size=1<<16):
+
+        q = int(self.rgsw.q)
+        seed = urandom(32)
+
+        try:
+            s1, s2 = Sampler(q, cdtTable(self.sigma), seed), Sampler(q, cdtTable(self.sigma), seed)
+            assert all([(s1.uniform(size) == s2.uniform(size)).all(), (s1.gaussian(size) == s2.gaussian(size)).all()])
+
+            u, b, g = s1.uniform(size), s1.binary(size), s1.gaussian(size)
+            assert all([u.min() >= 0, u.max() < q, set(b.tolist()) <= {0, 1}])
+            assert abs(g.mean()) < 0.1 * self.sigma and abs(g.std() - self.sigma) < 0.1 * self.sigma
+
+            print("vectorized CSPRNG samplers [OK]\n")
+
+        except Exception as e:
+            print("vectorized CSPRNG samplers [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def seededKeyTest(self):
+
+        nrgsw = RingGSW(self.Rq, self.sigma, 'numpy')
+        sk, cpk = nrgsw.keygenSeeded()
+        m = nrgsw.randomElement()
+
+        try:
+            pk = nrgsw.expandKey(decode(encode(cpk)))
+            assert (pk == nrgsw.expandKey(cpk)).all()
+            assert (nrgsw.decrypt(nrgsw.encrypt(m, pk), sk) == m).all()
+            assert len(encode(cpk)) < len(encode(pk))
+
+            seed, a = self.rgsw.seededElement()
+            assert self.rgsw.expandElement(seed) == a
+
+            print("seed-compressed public keys [OK]\n")
+
+        except Exception as e:
+            print("seed-compressed public keys [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def batchedDecryptTest(self, L=5):
+
+        cts = [self.rgsw.encrypt(self.Rq.random_element(), self.pk) for _ in range(L)]
+        consts = [self.Zq.random_element() for _ in range(L)]
+
+        try:
+            assert self.rgsw.decryptBatch(cts, self.sk) == [self.rgsw.decrypt(ct, self.sk) for ct in cts]
+
+            batched = self.rgsw.decryptMultConstBatch(cts[0], consts, self.sk)
+            assert batched == [self.rgsw.decrypt(self.rgsw.homMultConst(cts[0], g), self.sk) for g in consts]
+            assert batched[0] == self.rgsw.lazy(cts[0]).multConst(consts[0]).decrypt(self.sk)
+
+            print("row-selective batched decryption [OK]\n")
+
+        except Exception as e:
+            print("row-selective batched decryption [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def keyDerivationTest(self, T=40, chunk=16):
+
+        ct = self.rgsw.encrypt(self.Rq.random_element(), self.pk)
+
+        try:
+            sender = ot_K_N.OTSender(self.Rq, [urandom(16) for _ in range(T)], self.sigma)
+            sender.alpha_1 = self.Zq.random_element()
+            sender.alpha_2 = self.Zq.random_element()
+
+            consts = [sender.alpha_2 * (sender.alpha_1 + i) for i in range(T)]
+            exact = [self.rgsw.decrypt(self.rgsw.homMultConst(ct, g), sender.fake_sk) for g in consts]
+
+            assert self.rgsw.decryptMultConstBatch(ct, consts, sender.fake_sk) == exact
+            assert list(sender.iter_keys(ct, chunk)) == polynomialHashes(exact)
+            assert ot_K_N.derive_keys(self.rgsw, ct, sender.fake_sk, [int(g) for g in consts]) == polynomialHashes(exact)
+
+            print("chunked K out of N key derivation [OK]\n")
+
+        except Exception as e:
+            print("chunked K out of N key derivation [Failed]")
+            print(f"\n{str(e)}\n")
+
+
+    def messageStoreTest(self, N=50):
+
+        messages = [urandom(randrange(0, 80)) for _ in range(N)]
+        e = randrange(N)
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+
+        try:
+            assert write_store(path, messages) == N
+
+            with MessageStore(path) as store:
+                assert len(store) == N and all([store[i] == messages[i] for i in range(N)])
+                assert pickle.loads(pickle.dumps(store))[e] == messages[e]
+
+                sender = ot_1_N.OTSender(self.Rq, store, self.sigma)
+                client = ot_1_N.OTReceiver(self.Rq, sender.pk, e, N)
+
+                B = client.homomorphic_encryption(sender.random_encryption())
+                assert client.decrypt(sender.generate_ciphertexts(B)) == messages[e]
+                record = store[e]
+
+            assert record == messages[e]
+
+            print("memory-mapped message store [OK]\n")
+
+        except Exception as e:
+            print("memory-mapped message store [Failed]")
+            print(f"\n{str(e)}\n")
+
+        os.remove(path)
+
+
+    def runAllTests(self):
+
+        self.propertiesTest()
+        self.encryptDecryptTest()
+        self.homMultConstTest()
+        self.homAddTest()
+        self.numpyBackendTest()
+        self.nttTest()
+        self.gadgetTest()
+        self.keyPoolTest()
+        self.ot_1_out_of_N_Test()
+        self.ot_K_out_of_N_Test()
+        self.ot_batch_Test()
+        self.ot_packed_Test()
+        self.parallelKeysTest()
+        self.codecTest()
+        self.framingTest()
+        self.instrumentationTest()
+        self.polynomialHashTest()
+        self.streamTest()
+        self.ciphertextTypesTest()
+        self.parameterSetTest()
+        self.scalarMultTest()
+        self.lazyExpressionTest()
+        self.pipelineTest()
+        self.samplerTest()
+        self.seededKeyTest()
+        self.batchedDecryptTest()
+        self.keyDerivationTest()
+        self.messageStoreTest()
+
+
+def main():
+
+    test = RingGSWOTTests(q=2**17, n=2**4, sigma=5)
+    test.runAllTests()
+
+
+if __name__ == '__main__':
+
+    main()
@@ -1,69 +1,171 @@
-from sage.all import PolynomialRing, ZZ
-import socket
-from Crypto.Util.number import long_to_bytes, bytes_to_long
-from hashlib import sha256
-
-
-HEADER_SIZE = 10
-
-
-def server_socket(host, port):
-
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    s.bind((host, port))
-    s.listen()
-    return s
-
-
-def send_data(c, data: bytes):
-
-    np = (len(data) >> 12) + ((len(data) & (1<<12)-1) > 0)
-    np_bytes = long_to_bytes(np)
-    header = f'{hex(len(np_bytes))[2:]:>0{HEADER_SIZE}}'.encode()
-    c.send(header + np_bytes)
-
-    i = 0
-    while i < np:
-        j = i<<12
-        if i < np-1:
-            c.send(data[j: j+(1<<12)])        
-        else:
-            data = data[j:]
-            len_bytes = long_to_bytes(len(data))
-            header = f'{hex(len(len_bytes))[2:]:>0{HEADER_SIZE}}'.encode()
-            c.send(header + len_bytes)
-            data = data + b'\x00'*((1<<12) - len(data))
-            c.send(data)
-        i += 1
-
-
-def recv_data(c):
-
-    header = c.recv(HEADER_SIZE)
-    data = c.recv(int(header.decode(), 16))
-    np = bytes_to_long(data)
-
-    data = b''
-    i = 0
-    while i < np:
-        if i < np-1:
-            data += c.recv(1<<12)
-        else:
-            len_bytes = c.recv(HEADER_SIZE)
-            len_bytes = c.recv(int(len_bytes.decode(), 16))
-            data += c.recv(1<<12)[:bytes_to_long(len_bytes)]
-        i += 1
-
-    return data
-
-
-def polynomialHash(pol):
-    
-    R = PolynomialRing(ZZ, 'x')
-    pol = R(list(pol))
-    
-    h = long_to_bytes(pol.subs(x=2))
-    h = sha256(h).digest()
-    
-    return h
+from sage.all import PolynomialRing, Zmod
+import socket
+from struct import Struct
+from Crypto.Util.number import long_to_bytes
+from hashlib import sha256
+from functools import lru_cache
+import numpy as np
+
+
+FRAME_HEADER = Struct('!Q')
+MAX_FRAME_SIZE = 1 << 30
+
+
+def server_socket(host, port):
+
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    s.bind((host, port))
+    s.listen()
+    return s
+
+
+@lru_cache(maxsize=None)
+def polynomial_ring(q, n):
+
+    F = PolynomialRing(Zmod(q), 'x')
+    x = F.gen()
+
+    return F.quotient(x**n + 1, 'x')
+
+
+class MeteredSocket:
+
+
+    def __init__(self, sock):
+
+        self.sock = sock
+        self.sent = 0
+        self.received = 0
+
+
+    def sendmsg(self, buffers):
+
+        nbytes = self.sock.sendmsg(buffers)
+        self.sent += nbytes
+        return nbytes
+
+
+    def sendall(self, data):
+
+        self.sock.sendall(data)
+        self.sent += len(data)
+
+
+    def recv_into(self, buf, size=0):
+
+        nbytes = self.sock.recv_into(buf, size)
+        self.received += nbytes
+        return nbytes
+
+
+    def __getattr__(self, name):
+
+        return getattr(self.sock, name)
+
+
+def send_data(c, data: bytes):
+
+    header = FRAME_HEADER.pack(len(data))
+    data = memoryview(data).cast('B')
+    total = len(header) + len(data)
+
+    sent = c.sendmsg([header, data]) if hasattr(c, 'sendmsg') else 0
+
+    if sent < len(header):
+        c.sendall(header[sent:])
+        sent = len(header)
+    if sent < total:
+        c.sendall(data[sent - len(header):])
+
+
+def recv_exact(c, size):
+
+    buf = bytearray(size)
+    view = memoryview(buf)
+    pos = 0
+
+    while pos < size:
+        nbytes = c.recv_into(view[pos:], size - pos)
+        if nbytes == 0:
+            raise ConnectionError('connection closed mid-frame')
+        pos += nbytes
+
+    return buf
+
+
+def recv_data(c, max_size=MAX_FRAME_SIZE):
+
+    size, = FRAME_HEADER.unpack(recv_exact(c, FRAME_HEADER.size))
+    if size > max_size:
+        raise ValueError(f'frame of {size} bytes exceeds the {max_size} byte limit')
+
+    return recv_exact(c, size)
+
+
+async def async_send_data(writer, data: bytes):
+
+    writer.write(FRAME_HEADER.pack(len(data)))
+    writer.write(data)
+    await writer.drain()
+
+
+async def async_recv_data(reader, max_size=MAX_FRAME_SIZE):
+
+    size, = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    if size > max_size:
+        raise ValueError(f'frame of {size} bytes exceeds the {max_size} byte limit')
+
+    return await reader.readexactly(size)
+
+
+def coefficientMatrix(pols):
+
+    if isinstance(pols, np.ndarray):
+        assert pols.ndim == 2
+        return pols
+
+    rows = [pol if isinstance(pol, np.ndarray) else np.array([int(c) for c in pol], dtype=object) for pol in pols]
+    mat = np.zeros((len(rows), max([len(row) for row in rows] + [1])), dtype=object)
+
+    for j, row in enumerate(rows):
+        mat[j, :len(row)] = row
+
+    return mat
+
+
+def polynomialValues(pols):
+
+    mat = coefficientMatrix(pols)
+
+    if mat.size == 0:
+        return [0] * len(mat)
+
+    if mat.dtype == object:
+        if max(map(abs, mat.flat)) >= 1 << 62:
+            return [sum([int(c) << i for i, c in enumerate(row)]) for row in mat]
+        mat = mat.astype(np.int64)
+
+    assert mat.min() >= 0, "coefficients must be reduced"
+
+    width = max(int(mat.max()).bit_length(), 1)
+    bits = ((mat[..., None] >> np.arange(width, dtype=np.int64)) & 1).astype(np.uint8)
+    planes = np.packbits(bits, axis=1, bitorder='little').transpose(0, 2, 1).copy()
+
+    values = []
+    for row in planes:
+        values.append(sum([int.from_bytes(plane.tobytes(), 'little') << b for b, plane in enumerate(row)]))
+
+    return values
+
+
+def polynomialHashes(pols):
+
+    return [sha256(long_to_bytes(v)).digest() for v in polynomialValues(pols)]
+
+
+def polynomialHash(pol):
+
+    pols = pol[None] if isinstance(pol, np.ndarray) else [pol]
+
+    return polynomialHashes(pols)[0]